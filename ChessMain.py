@@ -8,26 +8,20 @@ This file is responsible for handling user input and displaying the current Game
 
 """
 import json
-import multiprocessing
+import math
 import pathlib
-import sys
-import time
 import argparse
 import os
 import os.path as osp
 os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = "hide"
 
-import pygame as py
 import ChessEngine
-# from agents.expert import MrExpert
-from agents.random import MrRandom
-from student_agents.template import Agent as Agent1
-from student_agents.template2 import Agent as Agent2
+import MatchRunner
 from sys import exit
-from multiprocessing import Process, Queue, freeze_support
-import importlib.util
 import statistics as np
 
+py = None  # pygame, imported by main, so that the headless MatchRunner path works without it
+
 # Opening JSON file
 with open('Settings.json') as f:
     # returns JSON object as
@@ -85,7 +79,7 @@ def loadImages():
     # Note: we can acess an image by saying 'IMAGES["wp"]'
 
 
-def main(args):
+def main(args, agent1, agent2):
     """
     The main driver for our code. This will handle user or AI input and updating the graphics
 
@@ -93,10 +87,13 @@ def main(args):
     -------
     None.
     :param args:
-    :param agent_file_path2:
-    :param agent_file_path1:
+    :param agent1: agent class playing white, None for a human (see MatchRunner.loadAgent)
+    :param agent2: agent class playing black, None for a human
 
     """
+    global py
+    import pygame as py
+
     num_games = args.num_games - 1
     KingImg = py.image.load("images/bK.png")
     py.display.set_icon(KingImg)
@@ -110,37 +107,15 @@ def main(args):
         with open(args.output_file, 'w+') as f:
             pass
 
-    def return_agent(path_or_name: str):
-        if path_or_name == 'MrRandom':
-            agent = MrRandom
-        elif path_or_name == 'MrNovice':
-            agent = None
-        elif path_or_name == 'MrExpert':
-            agent = MrExpert
-        elif path_or_name == 'Human':
-            agent = None
-        elif path_or_name == 'Agent1':
-            agent = Agent1
-        elif path_or_name == 'Agent2':
-            agent = Agent2
-        else:
-            spec = importlib.util.spec_from_file_location("Agent", path_or_name)
-            foo = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(foo)
-            agent = foo.Agent
-
-        return agent
-
-    agent1 = return_agent(args.agent1)
-    agent2 = return_agent(args.agent2)
-
+    # both backends share the same interface, see BitboardGameState for their speed
+    game_state_class = ChessEngine.BitboardGameState if args.bitboards else ChessEngine.GameState
 
     py.init()
     if args.use_gui:
         screen = py.display.set_mode((BOARD_WIDTH + MOVE_LOG_PANEL_WIDTH, BOARD_HEIGHT + CLOCK_PANEL_HEIGHT))
     clock = py.time.Clock()
     # screen.fill(py.Color("white"))
-    game_state = ChessEngine.GameState()
+    game_state = game_state_class()
     valid_moves = game_state.getValidMoves()
     move_made = False  # flag variable for when a move is made
     animate = False  # flag variable for when we should animate a move
@@ -151,15 +126,12 @@ def main(args):
     game_over = False
     ai_thinking = False
     move_undone = False
-    move_finder_process = None  # neu
+    worker = None  # AgentWorker of the agent that is thinking
     moveLogFont = py.font.SysFont("Arial", 14, False, False)
     halfmoveClock = 0  # global halfmoveClock
-    GameTable = {"Draw by 50 move rule": 0, "Draw by threefold position repetition": 0, "Black wins by checkmate": 0,
-                 "White wins by checkmate": 0, "Black wins on time": 0, "White wins on time": 0,
-                 "Draw by insufficient material": 0, "White wins by illegal move": 0,
-                 "Black wins by illegal move": 0}
+    GameTable = MatchRunner.newGameTable()
 
-    start_time = -1
+    time_forfeit = False  # an agent did not register a move in time
 
     # playerOne = DIFFICULTY_WHITE == 0  # If a Human is playing white, else false
     # playerTwo = DIFFICULTY_BLACK == 0  # If a Human is playing white, else false
@@ -179,6 +151,18 @@ def main(args):
     if agent2:
         chessai_black = agent2()
 
+    def newWorkers():
+        # every agent keeps one process for the whole game, whiteToMove -> AgentWorker
+        return {True: MatchRunner.AgentWorker(chessai_white, game_state_class) if agent1 else None,
+                False: MatchRunner.AgentWorker(chessai_black, game_state_class) if agent2 else None}
+
+    def closeWorkers():
+        for w in workers.values():
+            if w is not None:
+                w.close()
+
+    workers = newWorkers()
+
     while running:
         human_turn = (game_state.whiteToMove and playerOne) or (not game_state.whiteToMove and playerTwo)
         for e in py.event.get():
@@ -212,10 +196,7 @@ def main(args):
                         for i in range(len(valid_moves)):
                             if move == valid_moves[i]:
                                 game_state.makeMove(move)
-                                if move.pieceCaptured == "--" and move.pieceMoved[1] != "p":
-                                    halfmoveClock += 1
-                                else:
-                                    halfmoveClock = 0
+                                halfmoveClock = MatchRunner.updateHalfmoveClock(halfmoveClock, move)
                                 move_made = True
                                 animate = True
                                 sqSelected = ()  # resets slected Squares
@@ -234,12 +215,14 @@ def main(args):
                     move_made = True
                     animate = False
                     game_over = False
+                    time_forfeit = False
                     if ai_thinking:
-                        move_finder_process.terminate()
+                        worker.interrupt()
+                        worker.result()  # the move is not needed anymore
                         ai_thinking = False
                     move_undone = False
                 if e.key == py.K_r:  # reset the board when "r" is pressed
-                    game_state = ChessEngine.GameState()
+                    game_state = game_state_class()
                     valid_moves = game_state.getValidMoves()
                     sqSelected = ()
                     playerClicks = []
@@ -247,10 +230,11 @@ def main(args):
                     move_made = False
                     animate = False
                     game_over = False
+                    time_forfeit = False
                     clock_counter = args.time_control
-                    if ai_thinking:
-                        move_finder_process.terminate()
-                        ai_thinking = False
+                    closeWorkers()
+                    workers = newWorkers()
+                    ai_thinking = False
                     move_undone = False
 
         # AI Move finder with multiprocessing
@@ -259,49 +243,45 @@ def main(args):
             if not ai_thinking:
                 ai_thinking = True
                 # print('white' if game_state.whiteToMove else 'black')
-                chessai = chessai_white if game_state.whiteToMove else chessai_black
-                return_queue = Queue()  # used to pass data between threads
-                chessai.clear_queue(return_queue)
-
-                move_finder_process = Process(target=chessai.findBestMove, args=(game_state, ))
-                move_finder_process.start()
-                start_time = time.time()
+                worker = workers[game_state.whiteToMove]
+                worker.go(game_state, args.time_control)
                 # print("AI is thinking ... ")
 
-            if time.time() - start_time > args.time_control or not move_finder_process.is_alive():
-                move_finder_process.kill()
-                move_finder_process.join()
-            # if not move_finder_process.is_alive():
-                ai_move, nextMoveScore, currentDepth = chessai.get_move()
-                ai_move = ChessEngine.Move((ai_move.startRow, ai_move.startCol), (ai_move.endRow, ai_move.endCol), game_state.board)
-                if not ai_move in game_state.getValidMoves():
-                    game_state.illegal_move_done = True
-
-                if game_state.whiteToMove:
-                    average_depth_per_game.append(currentDepth)
-                    average_depth_per_move.append(currentDepth)
-
-                if args.verbose:
-                    s = f"{'White' if game_state.whiteToMove else 'Black'}'s move: {str(ai_move)}\n" + \
-                        f"Current Depth is: {currentDepth}\n" + \
-                        f"The Score this move has is: {nextMoveScore}\n"
-                    print(s)
-                    if args.output_file:
-                        if not osp.isfile(args.output_file):
-                            raise SystemExit(str(args.output_file) + ' does no longer exist!')
-                        with open(args.output_file, 'a') as f:
-                            f.write(s)
-                # if ai_move is None:
-                #     print("sth wrong then??")
-                #     ai_move = ChessAI.findRandomMove(valid_moves)
-                game_state.makeMove(ai_move)
-                move_made = True
-                if ai_move.pieceCaptured == "--" and ai_move.pieceMoved[1] != "p":
-                    halfmoveClock += 1
-                else:
-                    halfmoveClock = 0
-                animate = True
+            # the deadline is kept by the worker, it does not depend on the frame rate or on clock_counter
+            if worker.wait(0) or worker.remaining() == 0:
+                if not worker.wait(0):
+                    worker.interrupt()
+                answer = worker.result()
                 ai_thinking = False
+                if answer is None or answer[0] is None:  # no move registered, the agent loses on time
+                    time_forfeit = True
+                else:
+                    ai_move, nextMoveScore, currentDepth = answer
+                    ai_move = ChessEngine.Move((ai_move.startRow, ai_move.startCol), (ai_move.endRow, ai_move.endCol), game_state.board)
+                    if not ai_move in game_state.getValidMoves():
+                        game_state.illegal_move_done = True
+
+                    if game_state.whiteToMove:
+                        average_depth_per_game.append(currentDepth)
+                        average_depth_per_move.append(currentDepth)
+
+                    if args.verbose:
+                        s = f"{'White' if game_state.whiteToMove else 'Black'}'s move: {str(ai_move)}\n" + \
+                            f"Current Depth is: {currentDepth}\n" + \
+                            f"The Score this move has is: {nextMoveScore}\n"
+                        print(s)
+                        if args.output_file:
+                            if not osp.isfile(args.output_file):
+                                raise SystemExit(str(args.output_file) + ' does no longer exist!')
+                            with open(args.output_file, 'a') as f:
+                                f.write(s)
+                    # if ai_move is None:
+                    #     print("sth wrong then??")
+                    #     ai_move = ChessAI.findRandomMove(valid_moves)
+                    game_state.makeMove(ai_move)
+                    move_made = True
+                    halfmoveClock = MatchRunner.updateHalfmoveClock(halfmoveClock, ai_move)
+                    animate = True
 
         # move animation and resetting clock
         if move_made:
@@ -317,24 +297,12 @@ def main(args):
             drawGameState(screen, game_state, valid_moves, sqSelected, moveLogFont)
 
         # draw EndGameText
-        if game_state.checkMate or game_state.staleMate or halfmoveClock == 100 or clock_counter < 0 - 0.3 or game_state.threefold or game_state.draw or game_state.illegal_move_done:
+        text = MatchRunner.adjudicate(game_state, halfmoveClock)
+        human_to_move = (game_state.whiteToMove and playerOne) or (not game_state.whiteToMove and playerTwo)
+        if text is None and (time_forfeit or (human_to_move and clock_counter < 0 - 0.3)):
+            text = "Black wins on time" if game_state.whiteToMove else "White wins on time"
+        if text is not None:
             game_over = True
-            if game_state.threefold:
-                text = "Draw by threefold position repetition"
-            elif halfmoveClock == 100:
-                text = "Draw by 50 move rule"
-            elif game_state.checkMate and game_state.whiteToMove:
-                text = "Black wins by checkmate"
-            elif game_state.checkMate:
-                text = "White wins by checkmate"
-            elif clock_counter < 0 and game_state.whiteToMove:
-                text = "Black wins on time"
-            elif game_state.draw:
-                text = "Draw by insufficient material"
-            elif game_state.illegal_move_done:
-                text = f"{'White' if game_state.whiteToMove else 'Black'} wins by illegal move"
-            else:
-                text = "White wins on time"
             if args.use_gui:
                 drawEndGameText(screen, text)
 
@@ -356,7 +324,7 @@ def main(args):
                                 f.write(str(np.mean(average_depth_per_move)) + '\n')
                 average_depth_per_move = []
                 # same as py.event K_r
-                game_state = ChessEngine.GameState()
+                game_state = game_state_class()
                 valid_moves = game_state.getValidMoves()
                 sqSelected = ()
                 playerClicks = []
@@ -364,10 +332,11 @@ def main(args):
                 move_made = False
                 animate = False
                 game_over = False
+                time_forfeit = False
                 clock_counter = args.time_control + 1
-                if ai_thinking:
-                    move_finder_process.terminate()
-                    ai_thinking = False
+                closeWorkers()
+                workers = newWorkers()
+                ai_thinking = False
                 move_undone = False
                 num_games -= 1
 
@@ -390,13 +359,20 @@ def main(args):
                         f.write('avg depth overall:' + str(np.mean(average_depth_per_game)))
             num_games -= 1
             if not args.use_gui:
+                closeWorkers()
                 raise SystemExit()
 
         if args.use_gui:
+            if ai_thinking:  # show the time the agent has left
+                clock_text = str(math.ceil(worker.remaining())).rjust(3)
             screen.blit(clock_font.render(clock_text, True, (255, 255, 255)),
                         (CLOCK_PANEL_WIDTH / 3, BOARD_HEIGHT + CLOCK_PANEL_HEIGHT / 2))
             py.display.flip()
-        clock.tick(MAX_FPS)
+        if ai_thinking:  # wait for the next frame, but wake up as soon as the agent answers or its time is up
+            worker.wait(min(1 / MAX_FPS, worker.remaining()))
+            clock.tick()
+        else:
+            clock.tick(MAX_FPS)
 
 
 def drawGameState(screen, gs, validMoves, sqSelected, moveLogFont):
@@ -651,7 +627,7 @@ def drawEndGameText(screen, text):
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument('--agent1', type=str, required=True,
-                        help='Either path to the .py file containing your agent or "MrRandom".')
+                        help='Either path to the .py file containing your agent, "MrRandom" or "MrExpert".')
     parser.add_argument('--agent2', type=str, required=True,
                         help='See --agent_one.')
     parser.add_argument('--output_file', type=str, default=None,
@@ -663,11 +639,18 @@ if __name__ == "__main__":
                         help='Whether the output file only contains the final result or all moves.')
     parser.add_argument('--num_games', type=int, default=1,
                         help='How many games you want to play with this settings and agents.'
-                             'Agents do NOT switch sides after each game.')
+                             'Agents do NOT switch sides after each game, unless --tournament is given.')
     parser.add_argument('--time_control', type=int, default=20,
                         help='How many seconds per move each player has.')
+    parser.add_argument('--tournament', default=False, action='store_true',
+                        help='Play the games in parallel, each on its own core, and switch sides after every game. '
+                             'Not possible with the gui or a human player, see MatchRunner.py.')
+    parser.add_argument('--processes', type=int, default=None,
+                        help='Number of games played at the same time with --tournament, one per core by default.')
     parser.add_argument('--evaluation', default=False, action='store_true',
                         help="Sets graphics driver to 'dummy', so that this runs on a server without optical output.")
+    parser.add_argument('--bitboards', default=False, action='store_true',
+                        help='Use the bitboard backend of the GameState for move generation.')
 
     args = parser.parse_args()
 
@@ -678,4 +661,11 @@ if __name__ == "__main__":
         args.use_gui = False
     # freeze_support()
 
-    main(args)
+    agent1 = MatchRunner.loadAgent(args.agent1)
+    agent2 = MatchRunner.loadAgent(args.agent2)
+    if args.tournament and (args.use_gui or not (agent1 and agent2)):
+        parser.error('--tournament plays without the gui, it cannot be combined with --use_gui or a human player')
+    if not args.use_gui and agent1 and agent2:
+        MatchRunner.main(args, agent1, agent2)  # nothing to draw, no need for pygame and the event loop
+    else:
+        main(args, agent1, agent2)
@@ -0,0 +1,807 @@
+# -*- coding: utf-8 -*-
+"""
+Plays games between two agents without pygame. Every agent runs in one process for the whole game (see AgentWorker),
+the referee waits for its answer directly instead of polling it from a GUI loop, so a move is taken as soon as the
+agent finishes.
+
+Examples:
+    python MatchRunner.py --agent1 MrExpert --agent2 MrRandom --num_games 10 --time_control 5
+    python MatchRunner.py --agent1 student_agents/template.py --agent2 MrExpert --verbose --output_file results.txt
+    python MatchRunner.py --agent1 MrExpert --agent2 Agent1 --num_games 100 --tournament
+
+ChessMain.py uses the same adjudication (see adjudicate) and runs its games through this module when neither the GUI
+is activated nor a human plays.
+
+"""
+import argparse
+import copy
+import ctypes
+import importlib.util
+import math
+import os
+import os.path as osp
+import pathlib
+import signal
+import statistics as np
+import sys
+import time
+import types
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import Pipe, Process, RawValue, Value, connection
+
+import ChessEngine
+from agents.expert import MrExpert
+from agents.random import MrRandom
+from student_agents.template import Agent as Agent1
+from student_agents.template2 import Agent as Agent2
+
+# signal that stops the search of an AgentWorker, None where it does not exist (Windows)
+INTERRUPT_SIGNAL = getattr(signal, 'SIGUSR1', None)
+INTERRUPT_GRACE = 1.  # seconds an interrupted agent may take to return its move before its process is killed
+NO_MOVE = -1  # move code of a MoveSlot if the agent registered None
+NO_DEPTH = -2 ** 31  # depth of a MoveSlot if the agent registered one that is not an integer, the score becomes NaN
+
+# possible results of a game, the keys of the game table
+GAME_RESULTS = ("Draw by 50 move rule", "Draw by threefold position repetition", "Black wins by checkmate",
+                "White wins by checkmate", "Black wins on time", "White wins on time",
+                "Draw by insufficient material", "White wins by illegal move", "Black wins by illegal move",
+                "Draw by stalemate")
+
+
+def newGameTable(white='White', black='Black'):
+    """
+    Counter for every result of GAME_RESULTS, white and black replace the names of the colors in the keys
+    """
+    return dict.fromkeys((renameResult(result, white, black) for result in GAME_RESULTS), 0)
+
+
+def renameResult(result, white, black):
+    """
+    Replaces the names of the colors in a result of GAME_RESULTS, e.g. by the names of the agents
+    """
+    if result.startswith('White'):
+        return white + result[len('White'):]
+    elif result.startswith('Black'):
+        return black + result[len('Black'):]
+    return result
+
+
+def loadAgent(path_or_name):
+    """
+    Agent class by name ('MrRandom', 'MrExpert', 'Agent1', 'Agent2') or path to a .py file containing a class Agent
+
+    Returns
+    -------
+    type or None
+        None for 'Human' and 'MrNovice'
+
+    """
+    if path_or_name == 'MrRandom':
+        return MrRandom
+    elif path_or_name == 'MrExpert':
+        return MrExpert
+    elif path_or_name in ('Human', 'MrNovice'):
+        return None
+    elif path_or_name == 'Agent1':
+        return Agent1
+    elif path_or_name == 'Agent2':
+        return Agent2
+    spec = importlib.util.spec_from_file_location("Agent", path_or_name)
+    foo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(foo)
+    return foo.Agent
+
+
+def updateHalfmoveClock(halfmoveClock, move):
+    """
+    Number of moves since the last capture or pawn move, 100 ends the game in a draw
+    """
+    if move.pieceCaptured == "--" and move.pieceMoved[1] != "p":
+        return halfmoveClock + 1
+    return 0
+
+
+def adjudicate(gs, halfmoveClock):
+    """
+    Result of the game if it is over, time losses are handled by the caller. getValidMoves has to be called before,
+    it sets the checkmate and stalemate flags.
+
+    Parameters
+    ----------
+    gs : GameState
+        position after the last move
+    halfmoveClock : int
+        see updateHalfmoveClock
+
+    Returns
+    -------
+    str or None
+        one of GAME_RESULTS, None if the game goes on
+
+    """
+    if gs.threefold:
+        return "Draw by threefold position repetition"
+    elif halfmoveClock >= 100:
+        return "Draw by 50 move rule"
+    elif gs.checkMate and gs.whiteToMove:
+        return "Black wins by checkmate"
+    elif gs.checkMate:
+        return "White wins by checkmate"
+    elif gs.staleMate:
+        return "Draw by stalemate"
+    elif gs.draw:
+        return "Draw by insufficient material"
+    elif gs.illegal_move_done:  # the illegal move was made, the side to move is the opponent
+        return f"{'White' if gs.whiteToMove else 'Black'} wins by illegal move"
+    return None
+
+
+class SearchInterrupted(BaseException):
+    """
+    Raised inside an agent worker when the referee stops the search at the deadline. Like KeyboardInterrupt it is no
+    Exception, so an "except Exception" inside the agent does not swallow it.
+    """
+
+
+class SlotData(ctypes.Structure):
+    """
+    Memory layout of a MoveSlot: two buffers, seq selects the one written last
+    """
+    _fields_ = [('seq', ctypes.c_uint64), ('moves', ctypes.c_int32 * 2), ('depths', ctypes.c_int32 * 2),
+                ('scores', ctypes.c_double * 2)]
+
+
+def moveCode(move):
+    """
+    Move.toInt code of a move registered by an agent, NO_MOVE for None
+
+    Parameters
+    ----------
+    move : Move
+        or any object with startRow, startCol, endRow and endCol, like the referee of ChessMain.py accepts
+
+    Returns
+    -------
+    int
+        NO_MOVE (with an error message) if the move has no squares on the board
+
+    """
+    if move is None:
+        return NO_MOVE
+    if isinstance(move, ChessEngine.Move):
+        return move.toInt()
+    try:
+        squares = int(move.startRow), int(move.startCol), int(move.endRow), int(move.endCol)
+    except (AttributeError, TypeError, ValueError):
+        squares = None
+    if squares is None or not all(0 <= x < 6 for x in squares):
+        print('MoveSlot: ignoring the move {!r} of the agent, it is not a move on the board'.format(move),
+              file=sys.stderr)
+        return NO_MOVE
+    startRow, startCol, endRow, endCol = squares
+    return startRow * 6 + startCol | (endRow * 6 + endCol) << 6
+
+
+class MoveSlot:
+    """
+    Best move of an agent in shared memory, it replaces the multiprocessing.Queue of the agent protocol. put
+    overwrites the slot in O(1) without pickling or locks, the referee reads the last registered move with read, even
+    after the agent process was killed.
+
+    There is a single writer (the agent). put fills the buffer that is not published and then increments seq, which
+    publishes it. read takes the buffer of the current seq and retries if seq changed meanwhile, so it never sees a
+    half written move and never waits for the agent.
+    """
+
+    def __init__(self):
+        self.data = RawValue(SlotData)
+        self.last = None  # seq and item of the last put of this process
+        self.lastRead = 0  # seq of the last item returned by get
+
+    def put(self, item):
+        """
+        Registers [move, score, depth], called by update_move. Never raises on the score or the depth, values that
+        do not fit are read back as None.
+        """
+        move, score, depth = item
+        try:
+            score = float(score)
+        except (TypeError, ValueError, OverflowError):
+            score = math.nan
+        try:
+            depth = int(depth)
+            if not NO_DEPTH < depth < -NO_DEPTH:
+                depth = NO_DEPTH
+        except (TypeError, ValueError, OverflowError):
+            depth = NO_DEPTH
+        data = self.data
+        seq = data.seq + 1
+        i = seq & 1
+        data.moves[i] = moveCode(move)
+        data.scores[i] = score
+        data.depths[i] = depth
+        data.seq = seq
+        self.last = seq, item
+
+    def read(self, board):
+        """
+        Last registered move, called by the referee
+
+        Parameters
+        ----------
+        board : list
+            board of the searched position, used for the moved and the captured piece of the move
+
+        Returns
+        -------
+        list or None
+            [move, score, depth], None if no move was registered
+
+        """
+        data = self.data
+        while True:
+            seq = data.seq
+            if seq == 0:
+                return None
+            i = seq & 1
+            code, score, depth = data.moves[i], data.scores[i], data.depths[i]
+            if data.seq == seq:  # otherwise the buffer might have been overwritten while reading
+                break
+        move = ChessEngine.Move.fromInt(code, board) if code != NO_MOVE else None
+        if math.isnan(score):
+            score = None
+        elif score.is_integer():
+            score = int(score)
+        return [move, score, depth if depth != NO_DEPTH else None]
+
+    def clear(self):
+        """
+        Forgets the registered move, only while the agent is not searching. The referee and the agent process both
+        call it before a search, each for its own copy of last and lastRead.
+        """
+        self.data.seq = 0
+        self.last = None
+        self.lastRead = 0
+
+    # the part of the multiprocessing.Queue interface used by get_move, inside the agent process
+    def empty(self):
+        return self.last is None or self.last[0] == self.lastRead
+
+    def get(self):
+        self.lastRead, item = self.last
+        return item
+
+
+def agentWorkerLoop(agent, gameStateClass, conn, slot):
+    """
+    Main function of an AgentWorker process. The agent instance lives as long as the process, so everything it stores
+    between its searches (transposition table, killer moves, ...) is kept for the whole game. The agent registers its
+    moves in slot.
+
+    Messages of the referee:
+        ('go', codes): search the position after the moves given as Move.toInt codes, answer with ('done',)
+        ('quit',): end the process
+    """
+    state = types.SimpleNamespace(searching=False)
+
+    def interrupt(signum, frame):
+        if state.searching:  # a signal arriving after the search is ignored
+            state.searching = False
+            raise SearchInterrupted()
+
+    if INTERRUPT_SIGNAL is not None:
+        signal.signal(INTERRUPT_SIGNAL, interrupt)
+    gs = gameStateClass()
+    played = []
+    while True:
+        message = conn.recv()
+        if message[0] == 'quit':
+            break
+        codes = message[1]
+        if codes[:len(played)] != played:  # moves were taken back, e.g. in the gui
+            gs = gameStateClass()
+            played = []
+        for code in codes[len(played):]:
+            gs.makeMove(ChessEngine.Move.fromInt(code, gs.board))
+            played.append(code)
+
+        slot.clear()  # last and lastRead of the previous search would hide the first moves of this one from get_move
+        agent.clear_queue(slot)
+        try:
+            state.searching = True
+            agent.findBestMove(copy.deepcopy(gs))  # an interrupted search must not leave gs half updated
+            state.searching = False
+        except SearchInterrupted:
+            pass
+        conn.send(('done',))
+    conn.close()
+
+
+class AgentWorker:
+    """
+    Process running one agent for a whole game. The referee sends the moves played so far for every search,
+    at the deadline the search is interrupted with a signal instead of killing the process. The moves of the agent
+    are read from a MoveSlot.
+
+    Usage:
+        worker = AgentWorker(agent, ChessEngine.GameState)
+        answer = worker.requestMove(gs, timeControl)
+        worker.close()
+    """
+
+    def __init__(self, agent, gameStateClass=ChessEngine.GameState):
+        """
+        Starts the process
+
+        Parameters
+        ----------
+        agent : object
+            agent instance following the protocol of MrRandom
+        gameStateClass : type
+            GameState or BitboardGameState
+
+        Returns
+        -------
+        None.
+
+        """
+        self.agent = agent
+        self.gameStateClass = gameStateClass
+        self.slot = MoveSlot()
+        self.board = None  # board of the searched position
+        self.conn, childConn = Pipe()
+        self.process = Process(target=agentWorkerLoop, args=(agent, gameStateClass, childConn, self.slot),
+                               daemon=True)
+        self.process.start()
+        childConn.close()
+        self.searching = False
+        self.started = None
+        self.deadline = None
+        self.snapshot = None  # [answer] of the slot taken by interrupt, None while the search is not interrupted
+        self.timings = []  # (latency, overshoot) in seconds for every answered search
+
+    def go(self, gs, timeControl=None):
+        """
+        Starts a search without waiting for it
+
+        Parameters
+        ----------
+        gs : GameState
+            position to search, the worker gets the moves played from the starting position (gs.moveLog)
+        timeControl : float
+            seconds until the deadline of the search, None if the caller stops it with interrupt at any time
+
+        Returns
+        -------
+        None.
+
+        """
+        self.slot.clear()
+        self.snapshot = None
+        self.board = list(gs.board)
+        self.conn.send(('go', [move.toInt() for move in gs.moveLog]))
+        self.searching = True
+        self.started = time.perf_counter()
+        self.deadline = self.started + timeControl if timeControl is not None else None
+
+    def remaining(self):
+        """
+        Seconds until the deadline of the running search, None if it has no deadline
+        """
+        if self.deadline is None:
+            return None
+        return max(0., self.deadline - time.perf_counter())
+
+    def wait(self, timeout=None):
+        """
+        Blocks until the answer of the search arrives, the process ends or timeout seconds passed
+
+        Returns
+        -------
+        Bool
+            False if the timeout expired
+
+        """
+        return bool(connection.wait((self.conn, self.process.sentinel), timeout))
+
+    def interrupt(self):
+        """
+        Stops the running search. The move registered up to now is the answer of the search, whatever the agent
+        registers afterwards is ignored.
+        """
+        if self.snapshot is not None:
+            return
+        self.snapshot = [self.slot.read(self.board)]
+        if INTERRUPT_SIGNAL is None:  # no signals on this platform, result replaces the worker
+            self.process.kill()
+        elif self.process.is_alive():
+            os.kill(self.process.pid, INTERRUPT_SIGNAL)
+
+    def result(self):
+        """
+        Waits for the answer of the search started with go
+
+        Returns
+        -------
+        list or None
+            [move, score, depth] as last registered by the agent with update_move, None if it did not register a
+            move. The move is taken when the agent finishes, at the latest at the deadline (or at interrupt, if the
+            search has no deadline). If the agent does not stop within INTERRUPT_GRACE seconds after that, its
+            process is replaced, which does not change the answer anymore.
+
+        """
+        self.searching = False
+        if self.snapshot is None and not self.wait(self.remaining() or 0.):
+            self.interrupt()
+        answered = self.wait(INTERRUPT_GRACE) and self.conn.poll()
+        if answered:
+            try:
+                self.conn.recv()
+            except EOFError:  # the agent ended its process
+                answered = False
+        elif self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        answer = self.snapshot[0] if self.snapshot is not None else self.slot.read(self.board)
+        received = time.perf_counter()
+        overshoot = max(0., received - self.deadline) if self.deadline is not None else 0.
+        self.timings.append((received - self.started, overshoot))
+        if not answered:
+            self.restart()
+        return answer
+
+    def requestMove(self, gs, timeControl):
+        """
+        Lets the agent search until it finishes or the time is up
+
+        Parameters
+        ----------
+        gs : GameState
+        timeControl : float
+            seconds
+
+        Returns
+        -------
+        list or None
+            see result
+
+        """
+        self.go(gs, timeControl)
+        if not self.wait(self.remaining()):  # returns as soon as the agent is done
+            self.interrupt()
+        return self.result()
+
+    def restart(self):
+        """
+        Replaces a worker that does not answer, the state of the agent is lost
+        """
+        timings = self.timings
+        self.close(force=True)
+        self.__init__(self.agent, self.gameStateClass)
+        self.timings = timings
+
+    def close(self, force=False):
+        """
+        Ends the process
+        """
+        if self.process.is_alive():
+            if force or self.searching:
+                self.process.kill()
+            else:
+                self.conn.send(('quit',))
+            self.process.join()
+        self.conn.close()
+
+
+def playGame(agentWhite, agentBlack, timeControl, gameStateClass=ChessEngine.GameState, verbose=False, log=print,
+             timings=None):
+    """
+    Plays one game, every agent runs in its own AgentWorker for the whole game
+
+    Parameters
+    ----------
+    agentWhite : object
+        agent instance playing white
+    agentBlack : object
+        agent instance playing black
+    timeControl : float
+        seconds per move
+    gameStateClass : type
+        GameState or BitboardGameState
+    verbose : Bool
+        log every move
+    log : callable
+        receives the verbose output
+    timings : dict
+        if given, 'w' and 'b' are set to the (latency, overshoot) of every move of that color, see AgentWorker
+
+    Returns
+    -------
+    str, list, list
+        the result (one of GAME_RESULTS) and the search depths reached by white and by black
+
+    """
+    workers = {True: AgentWorker(agentWhite, gameStateClass), False: AgentWorker(agentBlack, gameStateClass)}
+    try:
+        return playMoves(workers, timeControl, gameStateClass, verbose, log)
+    finally:
+        for worker in workers.values():
+            worker.close()
+        if timings is not None:
+            timings['w'] = workers[True].timings
+            timings['b'] = workers[False].timings
+
+
+def timingSummary(timings):
+    """
+    Average latency and largest overshoot of the deadline of a list of (latency, overshoot), see AgentWorker
+    """
+    if not timings:
+        return 'no moves'
+    latencies, overshoots = zip(*timings)
+    return 'avg latency {:.3f} ms, max overshoot {:.3f} ms ({} of {} moves after the deadline)'.format(
+        1000 * np.mean(latencies), 1000 * max(overshoots), sum(1 for o in overshoots if o > 0), len(timings))
+
+
+def playMoves(workers, timeControl, gameStateClass, verbose, log):
+    """
+    Game loop of playGame, workers maps whiteToMove to the AgentWorker of that color
+    """
+    gs = gameStateClass()
+    validMoves = gs.getValidMoves()
+    halfmoveClock = 0
+    depths = []
+    blackDepths = []
+    while True:
+        worker = workers[gs.whiteToMove]
+        answer = worker.requestMove(gs, timeControl)
+        if answer is None or answer[0] is None:
+            return ("Black" if gs.whiteToMove else "White") + " wins on time", depths, blackDepths
+        move, score, depth = answer
+        move = ChessEngine.Move((move.startRow, move.startCol), (move.endRow, move.endCol), gs.board)
+        (depths if gs.whiteToMove else blackDepths).append(depth)
+        if verbose:
+            latency, overshoot = worker.timings[-1]
+            log(f"{'White' if gs.whiteToMove else 'Black'}'s move: {str(move)}\n" +
+                f"Current Depth is: {depth}\n" +
+                f"The Score this move has is: {score}\n" +
+                f"Latency: {1000 * latency:.3f} ms, overshoot: {1000 * overshoot:.3f} ms\n")
+        if move not in validMoves:
+            return ("Black" if gs.whiteToMove else "White") + " wins by illegal move", depths, blackDepths
+
+        gs.makeMove(move)
+        halfmoveClock = updateHalfmoveClock(halfmoveClock, move)
+        validMoves = gs.getValidMoves()
+        result = adjudicate(gs, halfmoveClock)
+        if result is not None:
+            return result, depths, blackDepths
+
+
+def runMatch(agent1, agent2, numGames=1, timeControl=20, gameStateClass=ChessEngine.GameState, verbose=False,
+             outputFile=None):
+    """
+    Plays several games, agent1 always plays white. The results are printed in the format of ChessMain.
+
+    Parameters
+    ----------
+    agent1 : type
+        agent class playing white
+    agent2 : type
+        agent class playing black
+    numGames : int
+    timeControl : float
+        seconds per move
+    gameStateClass : type
+        GameState or BitboardGameState
+    verbose : Bool
+        print every move and the intermediate results
+    outputFile : str
+        file the output is appended to as well
+
+    Returns
+    -------
+    dict
+        game table: result -> number of games
+
+    """
+    def log(s):
+        print(s)
+        if outputFile:
+            with open(outputFile, 'a') as f:
+                f.write(s + '\n')
+
+    chessai_white = agent1()
+    chessai_black = agent2()
+    GameTable = newGameTable()
+    average_depth_per_game = []
+    timings = {'w': [], 'b': []}
+    for game in range(numGames):
+        gameTimings = {}
+        text, depths, _ = playGame(chessai_white, chessai_black, timeControl, gameStateClass, verbose, log,
+                                   gameTimings)
+        GameTable[text] += 1
+        average_depth_per_game += depths
+        timings['w'] += gameTimings['w']
+        timings['b'] += gameTimings['b']
+        if verbose and game < numGames - 1:
+            log('Intermediate Results:')
+            log(str(GameTable))
+            if depths:
+                log('avg depth: ' + str(np.mean(depths)))
+
+    log('Final Results:')
+    log(str(GameTable))
+    if average_depth_per_game:
+        log('avg depth overall: ' + str(np.mean(average_depth_per_game)))
+    log('white: ' + timingSummary(timings['w']))
+    log('black: ' + timingSummary(timings['b']))
+    return GameTable
+
+
+def availableCores():
+    """
+    Cores this process may run on
+    """
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def initWorker(nextCore, cores):
+    """
+    Pins a worker of the tournament pool to its own core, the agent processes it starts inherit the affinity
+    """
+    with nextCore.get_lock():
+        core = cores[nextCore.value % len(cores)]
+        nextCore.value += 1
+    if hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, {core})
+
+
+def tournamentGame(agent1Name, agent2Name, agent1IsWhite, timeControl, bitboards, verbose):
+    """
+    Plays one game of runTournament in a worker process. The agents are given by name (see loadAgent), agent
+    classes loaded from a file cannot be sent to another process.
+
+    Returns
+    -------
+    str, dict, list
+        the result with 'agent1' and 'agent2' in place of the colors, the search depths and the timings (see
+        AgentWorker) of both agents as {'agent1': (depths, timings), 'agent2': (depths, timings)} and the verbose
+        output of the game
+
+    """
+    agent1 = loadAgent(agent1Name)()
+    agent2 = loadAgent(agent2Name)()
+    gameStateClass = ChessEngine.BitboardGameState if bitboards else ChessEngine.GameState
+    lines = []
+    timings = {}
+    if agent1IsWhite:
+        result, depths1, depths2 = playGame(agent1, agent2, timeControl, gameStateClass, verbose, lines.append,
+                                            timings)
+        stats = {'agent1': (depths1, timings['w']), 'agent2': (depths2, timings['b'])}
+        return renameResult(result, 'agent1', 'agent2'), stats, lines
+    result, depths2, depths1 = playGame(agent2, agent1, timeControl, gameStateClass, verbose, lines.append, timings)
+    stats = {'agent1': (depths1, timings['b']), 'agent2': (depths2, timings['w'])}
+    return renameResult(result, 'agent2', 'agent1'), stats, lines
+
+
+def runTournament(agent1Name, agent2Name, numGames=2, timeControl=20, processes=None, bitboards=False,
+                  verbose=False, outputFile=None):
+    """
+    Plays the games in parallel, every worker process runs on its own core. The agents switch colors after every
+    game, so each pair of games starts once with either agent playing white. The results are counted per agent.
+
+    Parameters
+    ----------
+    agent1Name : str
+        see loadAgent, plays white in the first game of every pair
+    agent2Name : str
+    numGames : int
+    timeControl : float
+        seconds per move
+    processes : int
+        number of games played at the same time, by default one per available core
+    bitboards : Bool
+        use BitboardGameState
+    verbose : Bool
+        print the moves of every game when it is finished and the result of every game
+    outputFile : str
+        file the output is appended to as well
+
+    Returns
+    -------
+    dict
+        game table: result -> number of games, with 'agent1' and 'agent2' in place of the colors
+
+    """
+    def log(s):
+        print(s)
+        if outputFile:
+            with open(outputFile, 'a') as f:
+                f.write(s + '\n')
+
+    cores = availableCores()
+    processes = max(1, min(processes or len(cores), numGames))
+    GameTable = newGameTable('agent1', 'agent2')
+    depths = {'agent1': [], 'agent2': []}
+    timings = {'agent1': [], 'agent2': []}
+    with ProcessPoolExecutor(processes, initializer=initWorker, initargs=(Value('i', 0), cores)) as executor:
+        games = {executor.submit(tournamentGame, agent1Name, agent2Name, game % 2 == 0, timeControl, bitboards,
+                                 verbose): game for game in range(numGames)}
+        for finished, future in enumerate(as_completed(games), 1):
+            text, stats, lines = future.result()
+            GameTable[text] += 1
+            for agent, (agentDepths, agentTimings) in stats.items():
+                depths[agent] += agentDepths
+                timings[agent] += agentTimings
+            if verbose:
+                game = games[future]
+                for line in lines:
+                    log(line)
+                log('Game {} ({} games finished, agent{} played white): {}'.format(
+                    game + 1, finished, 1 if game % 2 == 0 else 2, text))
+
+    log('Final Results:')
+    log(str(GameTable))
+    for agent, name in (('agent1', agent1Name), ('agent2', agent2Name)):
+        wins = sum(n for text, n in GameTable.items() if text.startswith(agent))
+        draws = sum(n for text, n in GameTable.items() if text.startswith('Draw'))
+        log('{} ({}): {} wins, {} draws, {} losses'.format(agent, name, wins, draws, numGames - wins - draws))
+        if depths[agent]:
+            log('avg depth {}: {}'.format(agent, np.mean(depths[agent])))
+        log('{}: {}'.format(agent, timingSummary(timings[agent])))
+    return GameTable
+
+
+def main(args, agent1=None, agent2=None):
+    """
+    Runs the match or tournament described by the command line arguments, agent1 and agent2 are the agent classes
+    if the caller already loaded them
+    """
+    agent1 = agent1 or loadAgent(args.agent1)
+    agent2 = agent2 or loadAgent(args.agent2)
+    if agent1 is None or agent2 is None:
+        raise SystemExit('Humans can only play with the GUI of ChessMain.py')
+
+    if args.output_file:
+        if osp.isfile(args.output_file):
+            os.remove(args.output_file)
+        pathlib.Path(os.path.dirname(args.output_file) or '.').mkdir(parents=True, exist_ok=True)
+
+    start = time.time()
+    if args.tournament:
+        runTournament(args.agent1, args.agent2, args.num_games, args.time_control, args.processes, args.bitboards,
+                      args.verbose, args.output_file)
+    else:
+        game_state_class = ChessEngine.BitboardGameState if args.bitboards else ChessEngine.GameState
+        runMatch(agent1, agent2, args.num_games, args.time_control, game_state_class, args.verbose, args.output_file)
+    if args.verbose:
+        print('Played {} games in {:.1f} s'.format(args.num_games, time.time() - start))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--agent1', type=str, required=True,
+                        help='Either path to the .py file containing your agent, "MrRandom" or "MrExpert".')
+    parser.add_argument('--agent2', type=str, required=True,
+                        help='See --agent1.')
+    parser.add_argument('--output_file', type=str, default=None,
+                        help='File to save results to. If not given, all output will be printed to terminal only.'
+                             'This file will be overwritten, if it exists.')
+    parser.add_argument('--verbose', default=False, action='store_true',
+                        help='Whether the output contains all moves and intermediate results or only the final result.')
+    parser.add_argument('--num_games', type=int, default=1,
+                        help='How many games you want to play with this settings and agents.'
+                             'Agents do NOT switch sides after each game, unless --tournament is given.')
+    parser.add_argument('--time_control', type=int, default=20,
+                        help='How many seconds per move each player has.')
+    parser.add_argument('--tournament', default=False, action='store_true',
+                        help='Play the games in parallel, each on its own core, and switch sides after every game.')
+    parser.add_argument('--processes', type=int, default=None,
+                        help='Number of games played at the same time with --tournament, one per core by default.')
+    parser.add_argument('--bitboards', default=False, action='store_true',
+                        help='Use the bitboard backend of the GameState for move generation.')
+
+    args = parser.parse_args()
+    main(args)
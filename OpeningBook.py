@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+"""
+Opening book for the 6x6 starting position: a builder that searches the positions of the first plies offline and
+a reader that probes the resulting file without loading it into memory
+
+Build a book (takes a while, the positions are searched one after another):
+    python OpeningBook.py --plies 4 --depth 6 --output opening_book.bin
+
+Use it in an agent:
+    from OpeningBook import OpeningBook
+
+    with OpeningBook('opening_book.bin') as book:
+        move = book.getMove(gs)  # None if the position is not in the book
+
+File format: an 8 byte header followed by records sorted by key, every record consists of the zobrist key (8 bytes),
+the move as Move.toInt code (2 bytes), its score (2 bytes, signed) and the search depth (2 bytes), little endian.
+A position can have several records, ordered from the best to the worst move.
+
+"""
+import argparse
+import mmap
+import os
+import os.path as osp
+import random
+import struct
+import time
+
+import ChessEngine
+
+MAGIC = b'6x6BOOK1'
+RECORD = struct.Struct('<QHhH')
+KEY = struct.Struct('<Q')
+DEFAULT_PATH = osp.join(osp.dirname(osp.abspath(__file__)), 'opening_book.bin')
+
+
+class OpeningBook:
+    """
+    Reads a book written by writeBook. The file is memory mapped, a probe is a binary search over the records.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        """
+        Opens the book
+
+        Parameters
+        ----------
+        path : str
+            book file
+
+        Returns
+        -------
+        None.
+
+        """
+        self.file = open(path, 'rb')
+        size = os.fstat(self.file.fileno()).st_size
+        if size < len(MAGIC) or (size - len(MAGIC)) % RECORD.size:
+            self.file.close()
+            raise ValueError('{} is not an opening book'.format(path))
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.data[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError('{} is not an opening book'.format(path))
+        self.size = (size - len(MAGIC)) // RECORD.size
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return self.size
+
+    def lowerBound(self, key):
+        """
+        Index of the first record with a key not smaller than key
+        """
+        lo, hi = 0, self.size
+        data = self.data
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if KEY.unpack_from(data, len(MAGIC) + mid * RECORD.size)[0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def probe(self, key):
+        """
+        All book entries of a position
+
+        Parameters
+        ----------
+        key : int
+            GameState.zobristKey
+
+        Returns
+        -------
+        list of tuples
+            (move code, score, depth) from the best to the worst move, empty if the position is not in the book.
+            Use Move.fromInt(code, gs.board) to get the move.
+
+        """
+        entries = []
+        for i in range(self.lowerBound(key), self.size):
+            recordKey, code, score, depth = RECORD.unpack_from(self.data, len(MAGIC) + i * RECORD.size)
+            if recordKey != key:
+                break
+            entries.append((code, score, depth))
+        return entries
+
+    def getMove(self, gs, rng=None):
+        """
+        Book move for the current position
+
+        Parameters
+        ----------
+        gs : GameState
+        rng : random.Random
+            if given, one of the stored moves is chosen at random, otherwise the best one
+
+        Returns
+        -------
+        Move or None
+            a legal move, None if the position is not in the book
+
+        """
+        entries = self.probe(gs.zobristKey)
+        if rng is not None:
+            rng.shuffle(entries)
+        legalMoves = gs.getLegalMoves()
+        for code, score, depth in entries:
+            move = ChessEngine.Move.fromInt(code, gs.board)
+            if move in legalMoves:  # protects against zobrist collisions
+                return move
+        return None
+
+
+def writeBook(path, entries):
+    """
+    Writes a book file
+
+    Parameters
+    ----------
+    path : str
+    entries : dict
+        zobrist key -> list of (move, score, depth) from the best to the worst move
+
+    Returns
+    -------
+    None.
+
+    """
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        for key in sorted(entries):
+            for move, score, depth in entries[key]:
+                f.write(RECORD.pack(key, move.toInt(), max(-32768, min(32767, score)), depth))
+
+
+def buildBook(plies, depth, gameStateClass=ChessEngine.GameState, verbose=False):
+    """
+    Searches the positions of the first plies. For both colors the book side plays its best move while all replies
+    of the other side are followed, so the book covers every game in which one side plays from the book.
+
+    Parameters
+    ----------
+    plies : int
+        number of plies from the starting position covered by the book
+    depth : int
+        search depth of MrExpert for every position
+    gameStateClass : type
+        GameState or BitboardGameState
+    verbose : Bool
+        print the progress
+
+    Returns
+    -------
+    dict
+        zobrist key -> list with one (move, score, depth) entry
+
+    """
+    from agents.expert import MrExpert
+
+    searcher = MrExpert()
+    entries = {}
+    start = time.time()
+
+    def expand(gs, ply, bookColorIsWhite):
+        if ply >= plies:
+            return
+        key = gs.zobristKey
+        if gs.whiteToMove == bookColorIsWhite:
+            if key not in entries:
+                if not gs.getLegalMoves():
+                    return
+                *_, (move, score, reached) = searcher.search(gs, depth)
+                entries[key] = [(move, score, reached)]
+                if verbose:
+                    print('{:>6} positions, {:>7.1f} s'.format(len(entries), time.time() - start), end='\r')
+            moves = [entries[key][0][0]]
+        else:
+            moves = gs.getLegalMoves()
+        for move in moves:
+            gs.push(move)
+            expand(gs, ply + 1, bookColorIsWhite)
+            gs.pop()
+
+    expand(gameStateClass(), 0, True)
+    expand(gameStateClass(), 0, False)
+    if verbose:
+        print()
+    return entries
+
+
+def main(args):
+    gameStateClass = ChessEngine.BitboardGameState if args.bitboards else ChessEngine.GameState
+    entries = buildBook(args.plies, args.depth, gameStateClass, verbose=True)
+    writeBook(args.output, entries)
+    print('Wrote {} positions to {}'.format(len(entries), args.output))
+
+    # sanity check of the written file
+    with OpeningBook(args.output) as book:
+        gs = gameStateClass()
+        move = book.getMove(gs, random.Random())
+        print('Book move in the starting position: {}'.format(move))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--plies', type=int, default=4,
+                        help='Number of plies from the starting position covered by the book.')
+    parser.add_argument('--depth', type=int, default=6,
+                        help='Search depth for every book position.')
+    parser.add_argument('--output', type=str, default=DEFAULT_PATH,
+                        help='Book file, it will be overwritten if it exists.')
+    parser.add_argument('--bitboards', default=False, action='store_true',
+                        help='Use the bitboard backend of the GameState for the searches.')
+
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,532 @@
+# -*- coding: utf-8 -*-
+"""
+Endgame tablebases for the 6x6 board: a retrograde generator that solves small endings completely with the rules of
+ChessEngine.GameState (including the promotion to a rook) and a probe that reads the files through mmap
+
+Generate tables (the tables an ending converts into by captures and promotions are generated as well):
+    python Tablebase.py KRvK KBvK KNvK KpvK
+    python Tablebase.py KRvKp --directory tablebases
+
+Use them in an agent:
+    from Tablebase import Tablebase, WIN, DRAW, LOSS
+
+    tablebase = Tablebase('tablebases')
+    result = tablebase.probe(gs)  # None if the ending is not available
+    if result is not None:
+        outcome, distance = result  # from the point of view of the side to move, distance in plies to the mate
+        move = tablebase.bestMove(gs)
+
+A table is named after its material, e.g. KRvKp: white has king and rook, black king and pawn. Tables with the colors
+swapped are probed by flipping the board. Castling is not considered, threefold repetition and the 50 move rule are
+ignored. A file consists of an 8 byte header followed by one byte per index, see positionIndex and the value
+encoding below.
+
+"""
+import argparse
+import itertools
+import mmap
+import os
+import os.path as osp
+import time
+
+import ChessEngine
+from ChessEngine import KING_ATTACKS, KING_TARGETS, KNIGHT_TARGETS, RAYS, SLIDER_DIRECTIONS, SQUARE_TO_RC
+
+MAGIC = b'6x6TB001'
+DEFAULT_DIRECTORY = osp.join(osp.dirname(osp.abspath(__file__)), 'tablebases')
+PIECE_ORDER = 'KQRBNp'
+
+# outcomes from the point of view of the side to move
+WIN = 1
+DRAW = 0
+LOSS = -1
+
+# value of a position in the file: DRAW_VALUE, d for a win with mate in d plies (1 <= d < LOSS_OFFSET),
+# LOSS_OFFSET + d for a loss that is mate in d plies, INVALID for indices that are not a legal position
+DRAW_VALUE = 0
+LOSS_OFFSET = 128
+UNKNOWN = 254  # only used during the generation
+INVALID = 255
+
+EMPTY_BOARD = ['--'] * 36
+
+
+def parseSignature(signature):
+    """
+    Pieces of an ending in index order
+
+    Parameters
+    ----------
+    signature : str
+        e.g. "KRvKp"
+
+    Returns
+    -------
+    list of str
+        e.g. ['wK', 'wR', 'bK', 'bp']
+
+    """
+    sides = signature.split('v')
+    if len(sides) != 2 or any(side.count('K') != 1 or not side.startswith('K') for side in sides) or any(
+            piece not in PIECE_ORDER for side in sides for piece in side):
+        raise ValueError('Invalid ending "{}", expected something like "KRvKp"'.format(signature))
+    for side in sides:
+        if list(side) != sorted(side, key=PIECE_ORDER.index):
+            raise ValueError('The pieces of "{}" have to be ordered like "{}"'.format(signature, PIECE_ORDER))
+    return ['w' + piece for piece in sides[0]] + ['b' + piece for piece in sides[1]]
+
+
+def boardSignature(board):
+    """
+    Material of a board, e.g. "KRvKp"
+    """
+    white = sorted((piece[1] for piece in board if piece[0] == 'w'), key=PIECE_ORDER.index)
+    black = sorted((piece[1] for piece in board if piece[0] == 'b'), key=PIECE_ORDER.index)
+    return ''.join(white) + 'v' + ''.join(black)
+
+
+def flipSignature(signature):
+    white, black = signature.split('v')
+    return black + 'v' + white
+
+
+def flipBoard(board):
+    """
+    Mirrors the board vertically and swaps the colors, the pawns then move in the other direction
+    """
+    flipped = ['--'] * 36
+    for rc, piece in enumerate(board):
+        if piece != '--':
+            r, c = SQUARE_TO_RC[rc]
+            flipped[(5 - r) * 6 + c] = ('b' if piece[0] == 'w' else 'w') + piece[1]
+    return flipped
+
+
+def positionIndex(squares, whiteToMove):
+    """
+    Index of a position in its table
+
+    Parameters
+    ----------
+    squares : list of int
+        square of every piece in the order of parseSignature, pieces of the same kind in ascending order
+    whiteToMove : Bool
+
+    Returns
+    -------
+    int
+
+    """
+    index = 0
+    for rc in squares:
+        index = index * 36 + rc
+    return index * 2 + (0 if whiteToMove else 1)
+
+
+def boardSquares(board, pieces):
+    """
+    Squares of the pieces in the order of parseSignature
+    """
+    found = {}
+    for rc, piece in enumerate(board):
+        if piece != '--':
+            found.setdefault(piece, []).append(rc)
+    used = dict.fromkeys(found, 0)
+    squares = []
+    for piece in pieces:
+        squares.append(found[piece][used[piece]])
+        used[piece] += 1
+    return squares
+
+
+def decodeValue(value):
+    """
+    Converts a value of a table into outcome and distance to mate in plies, None for invalid positions
+    """
+    if value == INVALID or value == UNKNOWN:
+        return None
+    if value == DRAW_VALUE:
+        return DRAW, 0
+    if value < LOSS_OFFSET:
+        return WIN, value
+    return LOSS, value - LOSS_OFFSET
+
+
+class TablebaseGenerator:
+    """
+    Solves endings by retrograde analysis. The legal moves of every position are counted with GameState, then the
+    results spread backwards from the mates: a position is won if one move leads to a lost position, lost if all
+    moves lead to won positions. Captures and promotions lead to other tables, which are generated first.
+    """
+
+    def __init__(self, directory=DEFAULT_DIRECTORY, verbose=False):
+        """
+        Parameters
+        ----------
+        directory : str
+            directory of the table files, existing tables are reused
+        verbose : Bool
+            print the progress
+
+        Returns
+        -------
+        None.
+
+        """
+        self.directory = directory
+        self.verbose = verbose
+        self.tables = {}  # signature -> values
+
+    def path(self, signature):
+        return osp.join(self.directory, signature + '.tb')
+
+    def getTable(self, signature):
+        """
+        Values of a table, it is loaded or generated if necessary
+        """
+        if signature not in self.tables:
+            path = self.path(signature)
+            if osp.isfile(path):
+                with open(path, 'rb') as f:
+                    if f.read(len(MAGIC)) != MAGIC:
+                        raise ValueError('{} is not a tablebase file'.format(path))
+                    self.tables[signature] = f.read()
+            else:
+                self.generate(signature)
+        return self.tables[signature]
+
+    def lookup(self, board, whiteToMove):
+        """
+        Value of a position from another table, seen from the side to move
+        """
+        signature = boardSignature(board)
+        if signature == 'KvK':
+            return DRAW_VALUE
+        if signature not in self.tables and not osp.isfile(self.path(signature)):
+            flipped = flipSignature(signature)
+            if flipped in self.tables or osp.isfile(self.path(flipped)):
+                signature = flipped
+                board = flipBoard(board)
+                whiteToMove = not whiteToMove
+        table = self.getTable(signature)
+        return table[positionIndex(boardSquares(board, parseSignature(signature)), whiteToMove)]
+
+    def generate(self, signature):
+        """
+        Solves an ending and writes its table file
+
+        Parameters
+        ----------
+        signature : str
+            e.g. "KRvKp"
+
+        Returns
+        -------
+        None.
+
+        """
+        pieces = parseSignature(signature)
+        start = time.time()
+        gs = ChessEngine.GameState()
+        gs.castleRights = 0
+        gs.castleRightsLog = [0]
+        n = len(pieces)
+        blackKing = pieces.index('bK')
+        size = 36 ** n * 2
+
+        values = bytearray([INVALID]) * size
+        remaining = bytearray(size)  # number of moves that stay in this table and are not solved yet
+        longestWin = bytearray(size)  # longest mate of the opponent among the solved moves
+        DRAW_MOVE, WIN_MOVE = 1, 2
+        flags = bytearray(size)
+        buckets = {}  # distance -> positions that are solved with this distance, as (index, won)
+
+        # canonical placements: pieces of the same kind in ascending order
+        sameAsPrevious = [i > 0 and pieces[i] == pieces[i - 1] for i in range(n)]
+
+        def setPosition(squares, whiteToMove):
+            board = gs.board
+            board[:] = EMPTY_BOARD
+            for piece, rc in zip(pieces, squares):
+                board[rc] = piece
+            gs.whiteToMove = whiteToMove
+            gs.whiteKingLocation = SQUARE_TO_RC[squares[0]]
+            gs.blackKingLocation = SQUARE_TO_RC[squares[blackKing]]
+
+        def isValid(squares, whiteToMove):
+            """the side that is not to move must not be in check"""
+            setPosition(squares, whiteToMove)
+            kingRC = squares[blackKing] if whiteToMove else squares[0]
+            return not gs.isSquareAttacked(kingRC, 'w' if whiteToMove else 'b')
+
+        # count the moves of every position and solve mates, stalemates and moves into other tables
+        for squares in itertools.product(range(36), repeat=n):
+            if len(set(squares)) != n or KING_ATTACKS[squares[0]] >> squares[blackKing] & 1:
+                continue
+            if any(sameAsPrevious[i] and squares[i] < squares[i - 1] for i in range(n)):
+                continue
+            if any(piece[1] == 'p' and not 1 <= squares[i] // 6 <= 4 for i, piece in enumerate(pieces)):
+                continue
+            for whiteToMove in (True, False):
+                if not isValid(squares, whiteToMove):
+                    continue
+                index = positionIndex(squares, whiteToMove)
+                values[index] = UNKNOWN
+                moves = gs.getLegalMoves()
+                if not moves:
+                    kingRC = squares[0] if whiteToMove else squares[blackKing]
+                    if gs.isSquareAttacked(kingRC, 'b' if whiteToMove else 'w'):  # checkmate
+                        buckets.setdefault(0, []).append((index, False))
+                    else:  # stalemate
+                        values[index] = DRAW_VALUE
+                    continue
+                shortestWin = None
+                for move in moves:
+                    if move.pieceCaptured == '--' and not move.isPawnPromotion:
+                        remaining[index] += 1
+                        continue
+                    gs.push(move)
+                    value = self.lookup(gs.board, gs.whiteToMove)
+                    gs.pop()
+                    if value == DRAW_VALUE:
+                        flags[index] |= DRAW_MOVE
+                    elif value < LOSS_OFFSET:  # the opponent wins
+                        longestWin[index] = max(longestWin[index], value)
+                    elif shortestWin is None or value - LOSS_OFFSET + 1 < shortestWin:
+                        shortestWin = value - LOSS_OFFSET + 1
+                if shortestWin is not None:
+                    flags[index] |= WIN_MOVE
+                    buckets.setdefault(shortestWin, []).append((index, True))
+                elif remaining[index] == 0 and not flags[index] & DRAW_MOVE:
+                    buckets.setdefault(longestWin[index] + 1, []).append((index, False))
+
+        if self.verbose:
+            print('{}: counted the moves in {:.1f} s'.format(signature, time.time() - start))
+
+        # spread the results backwards, shorter mates first
+        distance = 0
+        while distance <= max(buckets, default=-1):
+            for index, won in buckets.pop(distance, ()):
+                if values[index] != UNKNOWN:
+                    continue
+                if won:
+                    values[index] = distance
+                else:
+                    values[index] = LOSS_OFFSET + distance
+                for previous in self.predecessors(gs, pieces, index):
+                    if values[previous] != UNKNOWN:
+                        continue
+                    if not won:  # the side to move in previous can move into this lost position
+                        flags[previous] |= WIN_MOVE
+                        buckets.setdefault(distance + 1, []).append((previous, True))
+                    else:
+                        remaining[previous] -= 1
+                        longestWin[previous] = max(longestWin[previous], distance)
+                        if remaining[previous] == 0 and not flags[previous] & (DRAW_MOVE | WIN_MOVE):
+                            buckets.setdefault(longestWin[previous] + 1, []).append((previous, False))
+            distance += 1
+            if distance >= LOSS_OFFSET - 1:
+                raise ValueError('{} has mates longer than a table can store'.format(signature))
+
+        # everything else is a draw
+        for index in range(size):
+            if values[index] == UNKNOWN:
+                values[index] = DRAW_VALUE
+
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.path(signature), 'wb') as f:
+            f.write(MAGIC)
+            f.write(values)
+        self.tables[signature] = bytes(values)
+        if self.verbose:
+            print('{}: solved in {:.1f} s'.format(signature, time.time() - start))
+
+    def predecessors(self, gs, pieces, index):
+        """
+        Positions of the same table from which a legal move without capture or promotion leads to the position
+
+        Parameters
+        ----------
+        gs : GameState
+            used as scratch board
+        pieces : list
+            see parseSignature
+        index : int
+
+        Returns
+        -------
+        list of int
+            indices of the previous positions
+
+        """
+        n = len(pieces)
+        whiteToMove = index % 2 == 0
+        squares = []
+        rest = index // 2
+        for _ in range(n):
+            rest, rc = divmod(rest, 36)
+            squares.append(rc)
+        squares.reverse()
+
+        board = gs.board
+        board[:] = EMPTY_BOARD
+        for piece, rc in zip(pieces, squares):
+            board[rc] = piece
+        movedColor = 'b' if whiteToMove else 'w'  # the side that made the last move
+        otherKing = squares[pieces.index('bK')] if movedColor == 'w' else squares[0]
+        result = []
+        for i, piece in enumerate(pieces):
+            if piece[0] != movedColor:
+                continue
+            rc = squares[i]
+            typus = piece[1]
+            if typus == 'K':
+                origins = [target[2] for target in KING_TARGETS[rc] if board[target[2]] == '--']
+            elif typus == 'N':
+                origins = [target[2] for target in KNIGHT_TARGETS[rc] if board[target[2]] == '--']
+            elif typus == 'p':
+                origin = rc + (6 if movedColor == 'w' else -6)  # one row back
+                r = rc // 6
+                origins = [origin] if 1 <= origin // 6 <= 4 and r != 0 and r != 5 and board[origin] == '--' else []
+            else:
+                origins = []
+                for j in SLIDER_DIRECTIONS[typus]:
+                    for endRow, endCol, endRC in RAYS[rc][j]:
+                        if board[endRC] != '--':
+                            break
+                        origins.append(endRC)
+
+            board[rc] = '--'
+            for origin in origins:
+                board[origin] = piece
+                # the king of the side to move now must not have been in check while the other side was to move
+                if not gs.isSquareAttacked(otherKing, movedColor):
+                    result.append(positionIndex(boardSquares(board, pieces), movedColor == 'w'))
+                board[origin] = '--'
+            board[rc] = piece
+        return result
+
+
+class Tablebase:
+    """
+    Probes the table files of a directory, they are memory mapped when they are needed for the first time
+    """
+
+    def __init__(self, directory=DEFAULT_DIRECTORY):
+        self.directory = directory
+        self.files = {}  # signature -> (file, mmap) or None if there is no such table
+
+    def close(self):
+        for entry in self.files.values():
+            if entry is not None:
+                entry[1].close()
+                entry[0].close()
+        self.files = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def table(self, signature):
+        """
+        Memory mapped table or None if it does not exist
+        """
+        if signature not in self.files:
+            path = osp.join(self.directory, signature + '.tb')
+            if osp.isfile(path):
+                f = open(path, 'rb')
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                if data[:len(MAGIC)] != MAGIC:
+                    data.close()
+                    f.close()
+                    raise ValueError('{} is not a tablebase file'.format(path))
+                self.files[signature] = (f, data)
+            else:
+                self.files[signature] = None
+        entry = self.files[signature]
+        return entry[1] if entry is not None else None
+
+    def probe(self, gs):
+        """
+        Result of the current position, castling is not considered
+
+        Parameters
+        ----------
+        gs : GameState
+
+        Returns
+        -------
+        tuple or None
+            (outcome, distance): outcome is WIN, DRAW or LOSS from the point of view of the side to move, distance
+            the number of plies until the mate. None if the ending is not available.
+
+        """
+        board = gs.board
+        whiteToMove = gs.whiteToMove
+        signature = boardSignature(board)
+        if signature == 'KvK':
+            return DRAW, 0
+        data = self.table(signature)
+        if data is None:
+            signature = flipSignature(signature)
+            data = self.table(signature)
+            if data is None:
+                return None
+            board = flipBoard(board)
+            whiteToMove = not whiteToMove
+        index = positionIndex(boardSquares(board, parseSignature(signature)), whiteToMove)
+        return decodeValue(data[len(MAGIC) + index])
+
+    def bestMove(self, gs):
+        """
+        Move that wins fastest, keeps the draw or loses slowest
+
+        Parameters
+        ----------
+        gs : GameState
+
+        Returns
+        -------
+        Move or None
+            None if the position or one of the positions after a move is not available
+
+        """
+        best = None
+        bestKey = None
+        for move in gs.getLegalMoves():
+            gs.push(move)
+            result = self.probe(gs)
+            gs.pop()
+            if result is None:
+                return None
+            outcome, distance = result
+            # the outcome is seen from the opponent: prefer its fast losses, then draws, then its slow wins
+            key = (outcome, distance if outcome == LOSS else -distance)
+            if bestKey is None or key < bestKey:
+                best, bestKey = move, key
+        return best
+
+
+def main(args):
+    generator = TablebaseGenerator(args.directory, verbose=True)
+    for signature in args.endings:
+        parseSignature(signature)
+        if osp.isfile(generator.path(signature)) and not args.overwrite:
+            print('{} exists already'.format(generator.path(signature)))
+            continue
+        generator.generate(signature)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('endings', type=str, nargs='+',
+                        help='Endings to solve, e.g. KRvK or KRvKp (white pieces v black pieces).')
+    parser.add_argument('--directory', type=str, default=DEFAULT_DIRECTORY,
+                        help='Directory of the table files.')
+    parser.add_argument('--overwrite', default=False, action='store_true',
+                        help='Solve the endings again even if their files exist.')
+
+    args = parser.parse_args()
+    main(args)
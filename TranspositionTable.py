@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+Fixed-size transposition table for the search of an agent, keyed by GameState.zobristKey
+
+Usage:
+    from TranspositionTable import TranspositionTable, EXACT, LOWER_BOUND, UPPER_BOUND
+
+    table = TranspositionTable(memoryMB=32)
+    table.newSearch()  # before every call of findBestMove
+    entry = table.probe(gs.zobristKey)
+    if entry is not None:
+        depth, score, bound, moveCode = entry
+        bestMove = Move.fromInt(moveCode, gs.board) if moveCode else None
+    ...
+    table.store(gs.zobristKey, depth, score, EXACT, bestMove)
+
+The memory does not grow during the game: all slots are allocated in typed arrays when the table is created.
+
+"""
+from array import array
+
+# bound types of the stored score
+EXACT = 0
+LOWER_BOUND = 1  # the search failed high, the score is at least this value
+UPPER_BOUND = 2  # the search failed low, the score is at most this value
+
+EMPTY = -32768  # depth of an unused slot
+# bytes per slot: key (Q), score (d), move (H), depth (h), bound (b), generation (B)
+SLOT_SIZE = 8 + 8 + 2 + 2 + 1 + 1
+
+
+class TranspositionTable:
+    """
+    Every bucket consists of two slots: the first one keeps the entry with the highest depth (entries of older
+    searches are replaced anyway), the second one always takes the newest entry that did not go into the first one.
+    """
+
+    def __init__(self, memoryMB=16):
+        """
+        Allocates the table
+
+        Parameters
+        ----------
+        memoryMB : float
+            memory budget in megabytes, the number of buckets is the largest power of two that fits
+
+        Returns
+        -------
+        None.
+
+        """
+        buckets = max(1, int(memoryMB * 1024 * 1024) // (2 * SLOT_SIZE))
+        buckets = 1 << (buckets.bit_length() - 1)
+        self.mask = buckets - 1
+        self.size = 2 * buckets  # number of slots
+
+        self.keys = array('Q', [0]) * self.size
+        self.scores = array('d', [0.]) * self.size
+        self.moves = array('H', [0]) * self.size
+        self.depths = array('h', [EMPTY]) * self.size
+        self.bounds = array('b', [EXACT]) * self.size
+        self.generations = array('B', [0]) * self.size
+        self.generation = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+        self.stores = 0
+        self.overwrites = 0
+
+    def newSearch(self):
+        """
+        Marks the entries stored so far as old, so that the depth-preferred slots get replaced by the new search
+        """
+        self.generation = (self.generation + 1) & 255
+
+    def clear(self):
+        """
+        Removes all entries and resets the statistics
+        """
+        self.__init__(self.size * SLOT_SIZE / (1024 * 1024))
+
+    def probe(self, key):
+        """
+        Looks up a position
+
+        Parameters
+        ----------
+        key : int
+            GameState.zobristKey
+
+        Returns
+        -------
+        tuple or None
+            (depth, score, bound, move code) if the position is stored, otherwise None. The move code is 0 if no
+            move was stored, otherwise use Move.fromInt(code, gs.board) to get the move.
+
+        """
+        slot = (key & self.mask) << 1
+        keys = self.keys
+        if keys[slot] != key or self.depths[slot] == EMPTY:
+            slot += 1
+            if keys[slot] != key or self.depths[slot] == EMPTY:
+                if self.depths[slot - 1] == EMPTY and self.depths[slot] == EMPTY:
+                    self.misses += 1
+                else:  # other positions are stored in this bucket
+                    self.collisions += 1
+                return None
+        self.hits += 1
+        return self.depths[slot], self.scores[slot], self.bounds[slot], self.moves[slot]
+
+    def store(self, key, depth, score, bound=EXACT, move=None):
+        """
+        Stores the result of a search
+
+        Parameters
+        ----------
+        key : int
+            GameState.zobristKey
+        depth : int
+            remaining search depth of the result
+        score : float
+        bound : int
+            EXACT, LOWER_BOUND or UPPER_BOUND
+        move : Move
+            best move or None
+
+        Returns
+        -------
+        None.
+
+        """
+        slot = (key & self.mask) << 1
+        depths = self.depths
+        storedDepth = depths[slot]
+        if (storedDepth == EMPTY or depth >= storedDepth or self.keys[slot] == key or
+                self.generations[slot] != self.generation):
+            moveCode = move.toInt() if move is not None else 0
+            if storedDepth != EMPTY and self.keys[slot] != key:
+                # the entry makes way for a deeper one and goes into the always-replace slot
+                self.moveSlot(slot, slot + 1)
+            elif moveCode == 0 and self.keys[slot] == key:
+                moveCode = self.moves[slot]  # keep the best move of the shallower search
+        else:
+            slot += 1
+            moveCode = move.toInt() if move is not None else 0
+            if moveCode == 0 and self.keys[slot] == key and depths[slot] != EMPTY:
+                moveCode = self.moves[slot]
+            elif depths[slot] != EMPTY and self.keys[slot] != key:
+                self.overwrites += 1
+        self.stores += 1
+        # the depth is written last: a store interrupted halfway (e.g. by the signal of MatchRunner) leaves an empty
+        # slot instead of an entry that mixes the key of one position with the score of another
+        depths[slot] = EMPTY
+        self.keys[slot] = key
+        self.scores[slot] = score
+        self.bounds[slot] = bound
+        self.moves[slot] = moveCode
+        self.generations[slot] = self.generation
+        depths[slot] = depth
+
+    def moveSlot(self, source, target):
+        """
+        Copies the entry of slot source to slot target
+        """
+        if self.depths[target] != EMPTY and self.keys[target] != self.keys[source]:
+            self.overwrites += 1
+        self.depths[target] = EMPTY  # depth last, see store
+        self.keys[target] = self.keys[source]
+        self.scores[target] = self.scores[source]
+        self.bounds[target] = self.bounds[source]
+        self.moves[target] = self.moves[source]
+        self.generations[target] = self.generations[source]
+        self.depths[target] = self.depths[source]
+
+    def usage(self):
+        """
+        Fraction of the slots in use
+        """
+        return 1 - self.depths.count(EMPTY) / self.size
+
+    def stats(self):
+        """
+        Statistics of the table since it was created or cleared
+
+        Returns
+        -------
+        dict
+            hits, misses (empty bucket), collisions (bucket used by other positions), stores, overwrites (entries
+            of other positions that were replaced), hit rate and usage
+
+        """
+        probes = self.hits + self.misses + self.collisions
+        return {'hits': self.hits, 'misses': self.misses, 'collisions': self.collisions, 'stores': self.stores,
+                'overwrites': self.overwrites, 'hitRate': self.hits / probes if probes else 0.,
+                'usage': self.usage()}
+
+    def __len__(self):
+        return self.size
@@ -0,0 +1,410 @@
+import os.path as osp
+
+from ChessEngine import (PIECE_VALUES, Move, KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, BETWEEN, SQUARE_TO_RC)
+from OpeningBook import OpeningBook, DEFAULT_PATH as BOOK_PATH
+from TranspositionTable import TranspositionTable, EXACT, LOWER_BOUND, UPPER_BOUND
+
+MATE = 100000  # score of a checkmate, reduced by the number of plies until it happens
+INFINITY = 1000000
+MAX_DEPTH = 64
+MAX_PLY = 128
+TABLE_MB = 32
+
+# distance of a square from the center: 1 for the four center squares, 3 for the ring around them, 5 for the rim
+CENTER_DISTANCE = [max(abs(2 * r - 5), abs(2 * c - 5)) for r in range(6) for c in range(6)]
+
+
+def buildPieceSquareTables():
+    """
+    Value of every piece on every square including its material, positive for white and negative for black
+
+    Returns
+    -------
+    dict
+        piece -> list of 36 values, "--" maps to zeros
+
+    """
+    centerBonus = {'N': {1: 15, 3: 0, 5: -15}, 'B': {1: 10, 3: 5, 5: -5}, 'Q': {1: 5, 3: 0, 5: -5},
+                   'R': {1: 0, 3: 0, 5: 0}, 'K': {1: 0, 3: 0, 5: 0}, 'p': {1: 5, 3: 0, 5: 0}}
+    pawnAdvance = [0, 50, 25, 10, 0, 0]  # by row from the white point of view, row 0 is never reached
+    tables = {'--': [0] * 36}
+    for piece, bonus in centerBonus.items():
+        material = PIECE_VALUES[piece] if piece != 'K' else 0
+        white = []
+        for rc in range(36):
+            r = rc // 6
+            value = material + bonus[CENTER_DISTANCE[rc]]
+            if piece == 'p':
+                value += pawnAdvance[r]
+            elif piece == 'R' and r == 1:  # rook on the second row of the opponent
+                value += 15
+            elif piece == 'K' and r == 5:  # keep the king on the back rank while there is material on the board
+                value += 10
+            white.append(value)
+        tables['w' + piece] = white
+        # black sees the board upside down
+        tables['b' + piece] = [-white[(5 - rc // 6) * 6 + rc % 6] for rc in range(36)]
+    return tables
+
+
+PIECE_SQUARE_TABLES = buildPieceSquareTables()
+
+
+class MrExpert:
+    def __init__(self):
+        self.move_queue = None
+
+        self.nextMove = None
+        self.counter = None
+        self.currentDepth = None
+        self.start = None
+        self.timeout = None
+        self.globalBestMove = None
+        self.globalBestScore = None
+        self.nextMoveScore = None
+
+        self.table = None
+        self.killers = None
+        self.history = None
+
+    def get_move(self):
+        move = None
+        while not self.move_queue.empty():
+            move = self.move_queue.get()
+        return move
+
+    def update_move(self, move, score=-1, depth=-1):
+        self.move_queue.put([move, score, depth])
+
+    def clear_queue(self, outer_queue):
+        self.move_queue = outer_queue
+
+    def findBestMove(self, gs):
+        """
+        Iterative deepening alpha-beta search with a transposition table, move ordering (hash move, captures by
+        MVV-LVA, killer moves, history heuristic) and a quiescence search. The best move is reported with
+        update_move after every completed depth, so the search can be stopped at any time. Positions of the opening
+        book are answered without searching.
+
+        Parameters
+        ----------
+        gs : GameState
+            current state of the game
+
+        Returns
+        -------
+        None.
+
+        """
+        rootMoves = gs.getLegalMoves()
+        if not rootMoves:
+            return
+        self.update_move(rootMoves[0], -1, 0)  # in case not even depth 1 finishes
+        if len(rootMoves) == 1:
+            return
+
+        if osp.isfile(BOOK_PATH):  # build it with OpeningBook.py
+            with OpeningBook(BOOK_PATH) as book:
+                bookMove = book.getMove(gs)
+            if bookMove is not None:
+                self.update_move(bookMove, 0, 0)
+                return
+
+        for move, score, depth in self.search(gs):
+            self.update_move(move, score, depth)
+
+    def search(self, gs, maxDepth=MAX_DEPTH):
+        """
+        Iterative deepening, yields the result of every completed depth. The position must have legal moves.
+
+        Parameters
+        ----------
+        gs : GameState
+        maxDepth : int
+
+        Yields
+        ------
+        Move, int, int
+            best move, its score and the depth
+
+        """
+        if self.table is None:  # kept between the moves when the agent runs in a persistent process
+            self.history = [0] * (36 * 36)  # before the table, an interrupt in between must not leave it None
+            self.table = TranspositionTable(TABLE_MB)
+        else:
+            self.history = [value >> 1 for value in self.history]  # older cutoffs count less
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+
+        for depth in range(1, maxDepth + 1):
+            self.currentDepth = depth
+            self.table.newSearch()
+            score = self.negamax(gs, depth, -INFINITY, INFINITY, 0)
+            self.globalBestMove = self.nextMove
+            self.globalBestScore = score
+            yield self.globalBestMove, score, depth
+            if abs(score) >= MATE - MAX_PLY:  # a forced mate was found, deeper searches will not change it
+                break
+
+    def negamax(self, gs, depth, alpha, beta, ply):
+        """
+        Alpha-beta search (principal variation search) from the point of view of the side to move
+
+        Parameters
+        ----------
+        gs : GameState
+        depth : int
+            remaining depth
+        alpha : int
+        beta : int
+        ply : int
+            distance from the root, the best move of the root is stored in self.nextMove
+
+        Returns
+        -------
+        int
+            score
+
+        """
+        if ply > 0 and (self.isRepetition(gs) or gs.isInsufficientMaterial()):
+            return 0
+
+        if gs.whiteToMove:
+            kingRow, kingCol = gs.whiteKingLocation
+            enemyColor = "b"
+        else:
+            kingRow, kingCol = gs.blackKingLocation
+            enemyColor = "w"
+        inCheck = gs.isSquareAttacked(kingRow * 6 + kingCol, enemyColor)
+        if inCheck and ply < MAX_PLY // 2:  # check extension
+            depth += 1
+        if depth <= 0 or ply >= MAX_PLY - 1:
+            return self.quiescence(gs, alpha, beta, ply)
+
+        key = gs.zobristKey
+        hashMove = 0
+        entry = self.table.probe(key)
+        if entry is not None:
+            entryDepth, entryScore, bound, hashMove = entry
+            if ply > 0 and entryDepth >= depth:
+                entryScore = scoreFromTable(int(entryScore), ply)
+                if bound == EXACT or (bound == LOWER_BOUND and entryScore >= beta) or (
+                        bound == UPPER_BOUND and entryScore <= alpha):
+                    return entryScore
+
+        alphaOriginal = alpha
+        bestScore = -INFINITY
+        bestMove = None
+        for i, move in enumerate(self.orderedMoves(gs, hashMove, enemyColor, ply)):
+            gs.push(move)
+            if i == 0:
+                score = -self.negamax(gs, depth - 1, -beta, -alpha, ply + 1)
+            else:  # try to prove that the move is worse with a null window first
+                score = -self.negamax(gs, depth - 1, -alpha - 1, -alpha, ply + 1)
+                if alpha < score < beta:
+                    score = -self.negamax(gs, depth - 1, -beta, -alpha, ply + 1)
+            gs.pop()
+            if score > bestScore:
+                bestScore = score
+                bestMove = move
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        if move.pieceCaptured[0] != enemyColor:  # remember quiet moves that caused a cutoff
+                            killers = self.killers[ply]
+                            if killers[0] != move:
+                                killers[1] = killers[0]
+                                killers[0] = move
+                            self.history[move.startRC * 36 + move.endRC] += depth * depth
+                        break
+        if bestMove is None:  # no legal moves
+            return -MATE + ply if inCheck else 0
+
+        if bestScore <= alphaOriginal:
+            bound = UPPER_BOUND
+        elif bestScore >= beta:
+            bound = LOWER_BOUND
+        else:
+            bound = EXACT
+        self.table.store(key, depth, scoreToTable(bestScore, ply), bound, bestMove)
+        if ply == 0:
+            self.nextMove = bestMove
+        return bestScore
+
+    def quiescence(self, gs, alpha, beta, ply):
+        """
+        Only searches captures and promotions that do not lose material (see GameState.see) until the position is
+        quiet, so that the evaluation is not done in the middle of an exchange
+
+        Parameters
+        ----------
+        gs : GameState
+        alpha : int
+        beta : int
+        ply : int
+
+        Returns
+        -------
+        int
+            score from the point of view of the side to move
+
+        """
+        standPat = self.evaluate(gs)
+        if standPat >= beta:
+            return standPat
+        if standPat > alpha:
+            alpha = standPat
+        for move in gs.getStagedMoves(capturesOnly=True):
+            # losing captures do not change the outcome, taking a piece at least as valuable as the attacker never loses
+            if PIECE_VALUES[move.pieceMoved[1]] > PIECE_VALUES[move.pieceCaptured[1]] and gs.see(move) < 0:
+                continue
+            gs.push(move)
+            score = -self.quiescence(gs, -beta, -alpha, ply + 1)
+            gs.pop()
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+        return alpha
+
+    def orderedMoves(self, gs, hashMove, enemyColor, ply):
+        """
+        Yields the legal moves in the order they are searched: the hash move, the captures and promotions in the
+        order of getStagedMoves, then the killer moves and the other quiet moves by their history score. The moves
+        are generated in the same stages, so a cutoff by the hash move or a capture does not pay for the quiet
+        moves. The position has to be the same whenever the generator is resumed.
+
+        Parameters
+        ----------
+        gs : GameState
+        hashMove : int
+            Move.toInt code of the best move stored in the transposition table, 0 if there is none
+        enemyColor : str
+        ply : int
+
+        Yields
+        ------
+        Move
+
+        """
+        if hashMove:
+            move = Move.fromInt(hashMove, gs.board)
+            if isPseudoLegal(gs, move) and gs.makeIfLegal(move):  # the entry might belong to another position
+                gs.pop()
+                yield move
+            else:
+                hashMove = 0
+        hashStart, hashEnd = hashMove & 63, hashMove >> 6 & 63
+
+        quiets = None
+        staged = gs.getStagedMoves()
+        for move in staged:
+            if hashMove and move.startRC == hashStart and move.endRC == hashEnd:
+                continue
+            if move.pieceCaptured[0] != enemyColor and not move.isPawnPromotion:  # end of the captures
+                quiets = [move]
+                quiets.extend(staged)
+                break
+            yield move
+        if not quiets:
+            return
+
+        killers = self.killers[ply]
+        history = self.history
+
+        def orderKey(move):
+            if move == killers[0] or move == killers[1]:
+                return -INFINITY
+            return -history[move.startRC * 36 + move.endRC]
+
+        quiets.sort(key=orderKey)
+        for move in quiets:
+            if not (hashMove and move.startRC == hashStart and move.endRC == hashEnd):
+                yield move
+
+    def evaluate(self, gs):
+        """
+        Material and piece placement from the point of view of the side to move
+
+        Parameters
+        ----------
+        gs : GameState
+
+        Returns
+        -------
+        int
+
+        """
+        tables = PIECE_SQUARE_TABLES
+        score = 0
+        for rc, piece in enumerate(gs.board):
+            score += tables[piece][rc]
+        return score if gs.whiteToMove else -score
+
+    def isRepetition(self, gs):
+        """
+        True if the position already occurred with the same side to move. Only the last 16 plies are checked,
+        a capture or pawn move in between makes a repetition impossible anyway in most cases.
+        """
+        log = gs.zobristLog
+        key = gs.zobristKey
+        for i in range(len(log) - 2, max(len(log) - 17, -1), -2):
+            if log[i] == key:
+                return True
+        return False
+
+
+def isPseudoLegal(gs, move):
+    """
+    True if the piece on the start square of the move belongs to the side to move and can reach the end square,
+    i.e. the move can be played with gs.makeIfLegal. Castle moves are not recognized.
+    """
+    board = gs.board
+    allyColor = "w" if gs.whiteToMove else "b"
+    piece = board[move.startRC]
+    endPiece = board[move.endRC]
+    if piece[0] != allyColor or endPiece[0] == allyColor:
+        return False
+    typus = piece[1]
+    startRC, endRC = move.startRC, move.endRC
+    if typus == "N":
+        return bool(KNIGHT_ATTACKS[startRC] >> endRC & 1)
+    if typus == "K":
+        return bool(KING_ATTACKS[startRC] >> endRC & 1)
+    if typus == "p":
+        if PAWN_ATTACKS[allyColor][startRC] >> endRC & 1:
+            return endPiece != "--"
+        return endPiece == "--" and endRC == startRC + (-6 if allyColor == "w" else 6)
+    (startRow, startCol), (endRow, endCol) = SQUARE_TO_RC[startRC], SQUARE_TO_RC[endRC]
+    straight = startRow == endRow or startCol == endCol
+    diagonal = abs(startRow - endRow) == abs(startCol - endCol)
+    if not (straight and typus != "B" or diagonal and typus != "R"):
+        return False
+    between = BETWEEN[startRC][endRC]
+    while between:
+        bit = between & -between
+        between ^= bit
+        if board[bit.bit_length() - 1] != "--":
+            return False
+    return True
+
+
+def scoreToTable(score, ply):
+    """
+    Mate scores are stored relative to the position, not to the root
+    """
+    if score >= MATE - MAX_PLY:
+        return score + ply
+    if score <= -MATE + MAX_PLY:
+        return score - ply
+    return score
+
+
+def scoreFromTable(score, ply):
+    """
+    Inverse of scoreToTable
+    """
+    if score >= MATE - MAX_PLY:
+        return score - ply
+    if score <= -MATE + MAX_PLY:
+        return score + ply
+    return score
@@ -0,0 +1,304 @@
+# -*- coding: utf-8 -*-
+"""
+Microbenchmarks for the hot paths of the GameState, run them before and after changing ChessEngine.py
+
+Examples:
+    python benchmark.py --save baseline.json
+    python benchmark.py --baseline baseline.json --threshold 10
+    python benchmark.py --bitboards --only getValidMoves makeMove/undoMove
+
+The benchmarks run over a fixed corpus of positions. Every result is the time per call in microseconds, the minimum
+over several repetitions to reduce the noise. With --baseline the exit code is 1 if a benchmark got slower by more
+than --threshold percent.
+
+"""
+import argparse
+import json
+import platform
+import timeit
+from sys import exit
+
+import ChessEngine
+from perft import parseBoard
+
+# positions in the format of str(gs) followed by the side to move
+CORPUS = {
+    'opening': [
+        """bR bB bN bK bB bR
+           bp bp bp bp bp bp
+           -- -- -- -- -- --
+           -- -- -- -- -- --
+           wp wp wp wp wp wp
+           wR wB wN wK wB wR w""",
+        """bR bB bN bK bB bR
+           bp bp -- -- bp bp
+           -- -- bp bp -- --
+           -- -- -- -- wp --
+           wp wp wp wp wK wp
+           wR wB wN -- wB wR w""",
+        """bR bB bN bK bB bR
+           bp bp -- bp bp wB
+           -- -- bp -- wp --
+           -- -- wp -- -- --
+           wp wp -- wp -- wp
+           wR -- wN wK wB wR b""",
+        """bR bB bN bK -- bR
+           bp bp bp bB bp --
+           -- wp -- bp -- bp
+           -- -- -- wN wp --
+           wp -- wp wp -- wp
+           wR wB -- wK wB wR b""",
+    ],
+    'middlegame': [
+        """bR -- -- -- bK bR
+           -- -- wp -- bp bB
+           bp bN bp bp wp --
+           wp -- -- wp -- --
+           -- wp -- -- -- wp
+           wR -- wN wK wB wR w""",
+        """bR bB -- bR -- --
+           bp bp bK bB bp --
+           -- -- wN bN -- --
+           -- bp -- wp wB bp
+           wp -- wp -- -- wp
+           wR wB -- wK -- wR w""",
+        """bR bB bN bR -- bK
+           bp bp bp -- -- bp
+           bB -- -- -- bp wK
+           -- -- -- -- -- wp
+           wR wp wp wp -- wN
+           -- wB -- -- wB wR w""",
+    ],
+    'endgame': [
+        """-- -- -- bK -- --
+           -- wp -- -- -- wR
+           -- -- -- wp -- --
+           -- -- -- -- wB wK
+           -- wR -- -- -- --
+           bR -- -- -- -- -- w""",
+        """-- -- -- -- -- bK
+           -- wp -- -- wR --
+           -- -- -- wp -- wK
+           -- -- -- -- -- --
+           -- -- bR -- -- --
+           -- -- -- -- wB -- w""",
+        """-- -- -- -- -- --
+           -- -- -- -- bK --
+           -- -- -- bp bp --
+           bR bR -- -- -- --
+           -- -- bp wK -- --
+           -- -- -- -- -- wR w""",
+    ],
+    'check': [
+        """-- -- -- -- bK --
+           -- wp -- -- wR --
+           -- -- bR wp -- wK
+           -- -- wB -- -- --
+           -- -- -- -- -- --
+           -- -- -- -- -- -- b""",
+        """bR -- bN bK -- bR
+           bp -- wp -- bp bB
+           -- -- bp bp wp --
+           -- -- -- -- -- --
+           wp wp -- wp -- wp
+           wR -- wN wK wB wR b""",
+        """-- -- -- -- -- --
+           -- -- -- -- bK wR
+           -- -- -- bp bp --
+           -- -- bR -- -- --
+           -- bR bp -- -- --
+           -- -- wK -- -- -- b""",
+    ],
+}
+
+
+def loadCorpus(gameStateClass):
+    """
+    Sets up the positions of the corpus
+
+    Parameters
+    ----------
+    gameStateClass : type
+        GameState or BitboardGameState
+
+    Returns
+    -------
+    list of tuples
+        (game state, legal moves) for every position
+
+    """
+    positions = []
+    for boards in CORPUS.values():
+        for text in boards:
+            gs = gameStateClass(*parseBoard(text))
+            positions.append((gs, gs.getLegalMoves()))
+    return positions
+
+
+def benchGetValidMoves(positions):
+    for gs, moves in positions:
+        gs.getValidMoves()
+    return len(positions)
+
+
+def benchMakeUndo(positions):
+    for gs, moves in positions:
+        for move in moves:
+            gs.makeMove(move)
+            gs.undoMove()
+    return sum(len(moves) for gs, moves in positions)
+
+
+def benchPushPop(positions):
+    for gs, moves in positions:
+        for move in moves:
+            gs.push(move)
+            gs.pop()
+    return sum(len(moves) for gs, moves in positions)
+
+
+def benchCheckForPinsAndChecks(positions):
+    for gs, moves in positions:
+        gs.checkForPinsAndChecks()
+    return len(positions)
+
+
+def benchSquareUnderAttack(positions):
+    for gs, moves in positions:
+        for r in range(6):
+            for c in range(6):
+                gs.squareUnderAttack(r, c)
+    return 36 * len(positions)
+
+
+def benchMoveConstruction(positions):
+    Move = ChessEngine.Move
+    for gs, moves in positions:
+        board = gs.board
+        for move in moves:
+            Move((move.startRow, move.startCol), (move.endRow, move.endCol), board)
+    return sum(len(moves) for gs, moves in positions)
+
+
+# name -> function running the benchmark once over all positions and returning the number of calls it made
+BENCHMARKS = {
+    'getValidMoves': benchGetValidMoves,
+    'makeMove/undoMove': benchMakeUndo,
+    'push/pop': benchPushPop,
+    'checkForPinsAndChecks': benchCheckForPinsAndChecks,
+    'squareUnderAttack': benchSquareUnderAttack,
+    'Move': benchMoveConstruction,
+}
+
+
+def runBenchmarks(gameStateClass, names, repeat=7, number=20):
+    """
+    Times the benchmarks
+
+    Parameters
+    ----------
+    gameStateClass : type
+        GameState or BitboardGameState
+    names : list
+        names of the benchmarks to run, see BENCHMARKS
+    repeat : int
+        number of repetitions, the fastest one counts
+    number : int
+        how often the benchmark runs over the corpus per repetition
+
+    Returns
+    -------
+    dict
+        name -> microseconds per call
+
+    """
+    positions = loadCorpus(gameStateClass)
+    results = {}
+    for name in names:
+        function = BENCHMARKS[name]
+        calls = function(positions)  # warm up and count the calls
+        best = min(timeit.repeat(lambda: function(positions), repeat=repeat, number=number))
+        results[name] = best / (number * calls) * 1e6
+    return results
+
+
+def compareResults(results, baseline, threshold):
+    """
+    Compares the results with a baseline
+
+    Parameters
+    ----------
+    results : dict
+        name -> microseconds per call
+    baseline : dict
+        name -> microseconds per call
+    threshold : float
+        allowed slow down in percent
+
+    Returns
+    -------
+    list of str
+        names of the benchmarks that regressed
+
+    """
+    regressions = []
+    for name, time in results.items():
+        if name not in baseline:
+            print('{:<24}{:>10.2f} us   (no baseline)'.format(name, time))
+            continue
+        change = (time / baseline[name] - 1) * 100
+        regressed = change > threshold
+        if regressed:
+            regressions.append(name)
+        print('{:<24}{:>10.2f} us   baseline {:>10.2f} us   {:>+7.1f} %{}'.format(
+            name, time, baseline[name], change, '   REGRESSION' if regressed else ''))
+    return regressions
+
+
+def main(args):
+    """
+    Runs the benchmarks, saves them and compares them with the baseline
+    """
+    gameStateClass = ChessEngine.BitboardGameState if args.bitboards else ChessEngine.GameState
+    backend = gameStateClass.__name__
+    results = runBenchmarks(gameStateClass, args.only or list(BENCHMARKS), args.repeat, args.number)
+
+    if args.save is not None:
+        with open(args.save, 'w') as f:
+            json.dump({'backend': backend, 'python': platform.python_version(), 'results': results}, f, indent=4)
+
+    if args.baseline is None:
+        for name, time in results.items():
+            print('{:<24}{:>10.2f} us'.format(name, time))
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline['backend'] != backend:
+        exit('The baseline was measured with {}, not {}'.format(baseline['backend'], backend))
+    regressions = compareResults(results, baseline['results'], args.threshold)
+    if regressions:
+        print('{} benchmark(s) regressed by more than {} %: {}'.format(
+            len(regressions), args.threshold, ', '.join(regressions)))
+        exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--save', type=str, default=None,
+                        help='Save the results as JSON to this file, e.g. to use them as baseline later.')
+    parser.add_argument('--baseline', type=str, default=None,
+                        help='JSON file written by --save to compare the results with.')
+    parser.add_argument('--threshold', type=float, default=10.,
+                        help='Allowed slow down compared to the baseline in percent.')
+    parser.add_argument('--only', type=str, nargs='+', default=None, choices=list(BENCHMARKS),
+                        help='Only run these benchmarks.')
+    parser.add_argument('--repeat', type=int, default=7,
+                        help='Number of repetitions, the fastest one counts.')
+    parser.add_argument('--number', type=int, default=20,
+                        help='How often every benchmark runs over the corpus per repetition.')
+    parser.add_argument('--bitboards', default=False, action='store_true',
+                        help='Use the bitboard backend of the GameState.')
+
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+Counts the leaf nodes of the move generation tree (perft) to verify and benchmark the move generation of ChessEngine
+
+Examples:
+    python perft.py 5
+    python perft.py 4 --divide --bitboards
+    python perft.py 6 --processes 4
+    python perft.py 3 --board_file position.txt --black
+
+"""
+import argparse
+import time
+from multiprocessing import Pool
+from sys import exit
+
+import ChessEngine
+
+GENERATORS = ('legal', 'staged', 'pseudo')
+
+
+def parseBoard(text):
+    """
+    Parses a board as printed by str(gs): 36 pieces like "wK" or "--", separated by whitespace, row by row
+    starting with the black back rank. An optional 37th token "w" or "b" gives the side to move.
+
+    Parameters
+    ----------
+    text : str
+
+    Returns
+    -------
+    list, Bool
+        the board and if white is to move
+
+    """
+    tokens = text.split()
+    whiteToMove = True
+    if len(tokens) == 37:
+        if tokens[-1] not in ('w', 'b'):
+            raise ValueError('The side to move has to be "w" or "b", got "{}"'.format(tokens[-1]))
+        whiteToMove = tokens.pop() == 'w'
+    if len(tokens) != 36:
+        raise ValueError('A board has 36 squares, got {}'.format(len(tokens)))
+    for token in tokens:
+        if token != '--' and (len(token) != 2 or token[0] not in 'wb' or token[1] not in 'pRNBKQ'):
+            raise ValueError('Unknown piece "{}"'.format(token))
+    return tokens, whiteToMove
+
+
+def perft(gs, depth, generator='legal'):
+    """
+    Number of leaf nodes of the move generation tree
+
+    Parameters
+    ----------
+    gs : GameState
+    depth : int
+    generator : str
+        'legal' (getLegalMoves), 'staged' (getStagedMoves) or 'pseudo' (getPseudoLegalMoves + makeIfLegal)
+
+    Returns
+    -------
+    int
+
+    """
+    if depth == 0:
+        return 1
+    if generator == 'pseudo':
+        nodes = 0
+        for move in gs.getPseudoLegalMoves():
+            if gs.makeIfLegal(move):
+                nodes += perft(gs, depth - 1, generator)
+                gs.pop()
+        return nodes
+
+    moves = gs.getLegalMoves() if generator == 'legal' else gs.getStagedMoves()
+    if depth == 1 and generator == 'legal':  # bulk counting
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        gs.push(move)
+        nodes += perft(gs, depth - 1, generator)
+        gs.pop()
+    return nodes
+
+
+def rootMoves(gs):
+    """
+    The legal moves of the root position in a fixed order
+    """
+    return sorted(gs.getLegalMoves(), key=lambda move: move.getChessNotation())
+
+
+def dividePart(task):
+    """
+    Counts the nodes below one root move, runs in a worker process of the pool
+
+    Parameters
+    ----------
+    task : tuple
+        gameStateClass, board, whiteToMove, move code (Move.toInt), depth, generator
+
+    Returns
+    -------
+    int
+
+    """
+    gameStateClass, board, whiteToMove, code, depth, generator = task
+    gs = gameStateClass(board, whiteToMove)
+    gs.push(ChessEngine.Move.fromInt(code, gs.board))
+    return perft(gs, depth - 1, generator)
+
+
+def divide(gs, depth, generator='legal', processes=1):
+    """
+    Number of leaf nodes below every root move
+
+    Parameters
+    ----------
+    gs : GameState
+    depth : int
+        at least 1
+    generator : str
+        see perft
+    processes : int
+        number of worker processes, the root moves are distributed among them
+
+    Returns
+    -------
+    list of tuples
+        (move, nodes) for every root move
+
+    """
+    moves = rootMoves(gs)
+    if processes > 1:
+        tasks = [(type(gs), gs.board, gs.whiteToMove, move.toInt(), depth, generator) for move in moves]
+        with Pool(processes) as pool:
+            counts = pool.map(dividePart, tasks, chunksize=1)
+    else:
+        counts = []
+        for move in moves:
+            gs.push(move)
+            counts.append(perft(gs, depth - 1, generator))
+            gs.pop()
+    return list(zip(moves, counts))
+
+
+def main(args):
+    """
+    Runs perft on the given position and prints the node count, the time and the nodes per second
+    """
+    try:
+        if args.board_file is not None:
+            with open(args.board_file) as f:
+                board, whiteToMove = parseBoard(f.read())
+        elif args.board is not None:
+            board, whiteToMove = parseBoard(args.board)
+        else:
+            board, whiteToMove = None, True
+    except ValueError as e:
+        exit('Invalid board: {}'.format(e))
+    if args.black:
+        whiteToMove = False
+
+    gameStateClass = ChessEngine.BitboardGameState if args.bitboards else ChessEngine.GameState
+    gs = gameStateClass(board, whiteToMove)
+    print(gs)
+
+    start = time.perf_counter()
+    if args.divide or args.processes > 1:
+        results = divide(gs, args.depth, args.generator, args.processes)
+        nodes = sum(count for move, count in results)
+    else:
+        results = []
+        nodes = perft(gs, args.depth, args.generator)
+    elapsed = time.perf_counter() - start
+
+    if args.divide:
+        for move, count in results:
+            print('{}: {}'.format(move.getChessNotation(), count))
+        print('Moves: {}'.format(len(results)))
+    print('Nodes: {}'.format(nodes))
+    print('Time: {:.3f} s'.format(elapsed))
+    print('Nodes/s: {:.0f}'.format(nodes / elapsed if elapsed > 0 else 0))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('depth', type=int,
+                        help='Depth of the move generation tree.')
+    parser.add_argument('--divide', default=False, action='store_true',
+                        help='Print the number of nodes below every root move.')
+    parser.add_argument('--board', type=str, default=None,
+                        help='Board as printed by str(gs): 36 pieces like "wK" or "--", separated by whitespace, '
+                             'optionally followed by "w" or "b" for the side to move. Default is the starting position.')
+    parser.add_argument('--board_file', type=str, default=None,
+                        help='File containing a board, see --board.')
+    parser.add_argument('--black', default=False, action='store_true',
+                        help='Black is to move.')
+    parser.add_argument('--processes', type=int, default=1,
+                        help='Number of processes, the root moves are distributed among them.')
+    parser.add_argument('--generator', type=str, default='legal', choices=GENERATORS,
+                        help='Move generator to use: getLegalMoves, getStagedMoves or getPseudoLegalMoves.')
+    parser.add_argument('--bitboards', default=False, action='store_true',
+                        help='Use the bitboard backend of the GameState for move generation.')
+
+    args = parser.parse_args()
+    if args.depth < 1:
+        parser.error('depth has to be at least 1')
+    main(args)
@@ -0,0 +1,5 @@
+import os.path as osp
+import sys
+
+# the modules of the game live in the root of the repository, not in a package
+sys.path.insert(0, osp.dirname(osp.dirname(osp.abspath(__file__))))
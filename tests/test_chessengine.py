@@ -0,0 +1,57 @@
+import random
+
+import ChessEngine
+
+
+def kingMoves(gs):
+    r, c = gs.whiteKingLocation if gs.whiteToMove else gs.blackKingLocation
+    moves = []
+    gs.getKingMoves(r, c, moves)
+    return sorted(move.getChessNotation() for move in moves)
+
+
+def compareKingMoves(board, whiteToMove):
+    expected = kingMoves(ChessEngine.GameState(board, whiteToMove))
+    assert kingMoves(ChessEngine.BitboardGameState(board, whiteToMove)) == expected
+    return expected
+
+
+def testKingDoesNotBlockTheCheckingRook():
+    board = ['--'] * 36
+    board[30], board[32], board[3] = 'bR', 'wK', 'bK'  # bR a1, wK c1, bK d6
+    assert compareKingMoves(board, True) == ['c1b2', 'c1c2', 'c1d2']
+
+
+def testKingMovesOfBothBackendsInCheck():
+    rng = random.Random(1)
+    checks = 0
+    for game in range(40):
+        gs = ChessEngine.GameState()
+        for ply in range(60):
+            moves = gs.getValidMoves()
+            if not moves or gs.checkMate or gs.staleMate:
+                break
+            if gs.inCheck:
+                checks += 1
+                compareKingMoves(list(gs.board), gs.whiteToMove)
+            gs.makeMove(rng.choice(moves))
+    assert checks > 0
+
+
+def testBitboardPushPopKeepsMasksInSync():
+    rng = random.Random(2)
+    for game in range(10):
+        gs = ChessEngine.BitboardGameState()
+        for ply in range(80):
+            moves = gs.getLegalMoves()
+            if not moves:
+                break
+            for move in moves:
+                before = list(gs.board), dict(gs.bitboards), dict(gs.colorBitboards), gs.zobristKey
+                gs.push(move)
+                pushed = dict(gs.bitboards), dict(gs.colorBitboards)
+                gs.initBitboards()
+                assert pushed == (gs.bitboards, gs.colorBitboards)
+                gs.pop()
+                assert (list(gs.board), gs.bitboards, gs.colorBitboards, gs.zobristKey) == before
+            gs.push(rng.choice(sorted(moves, key=lambda move: move.getChessNotation())))
@@ -0,0 +1,32 @@
+import types
+
+import ChessEngine
+import MatchRunner
+
+
+def testMoveSlotAcceptsMoveObjects():
+    gs = ChessEngine.GameState()
+    move = gs.getValidMoves()[0]
+    slot = MatchRunner.MoveSlot()
+    slot.put([move, 12, 3])
+    answer = slot.read(gs.board)
+    assert answer[0] == move and answer[1:] == [12, 3]
+
+
+def testMoveSlotAcceptsDuckTypedMoves():
+    gs = ChessEngine.GameState()
+    move = gs.getValidMoves()[0]
+    plain = types.SimpleNamespace(startRow=move.startRow, startCol=move.startCol, endRow=move.endRow,
+                                  endCol=move.endCol)
+    slot = MatchRunner.MoveSlot()
+    slot.put([plain, 0, 1])
+    assert slot.read(gs.board)[0] == move
+
+
+def testMoveSlotNeverRaises():
+    gs = ChessEngine.GameState()
+    slot = MatchRunner.MoveSlot()
+    slot.put([object(), None, 2.5])
+    assert slot.read(gs.board) == [None, None, 2]
+    slot.put([None, 'x', float('inf')])
+    assert slot.read(gs.board) == [None, None, None]